@@ -0,0 +1,124 @@
+"""Чтение API под ASGI без общего потока на все запросы.
+
+Django 3.2 выполняет синхронные представления под ASGI в одном потоке
+на процесс, так что медленный запрос задерживает все остальные.
+Асинхронного ORM в этой версии нет, представления DRF тоже синхронные,
+поэтому GET-запросы к горячим эндпоинтам выполняются в отдельном пуле
+из ASYNC_VIEWS_THREADS потоков: цикл событий держит соединения
+клиентов, а размер пула ограничивает число соединений с БД.
+Изменяющие запросы идут в общий поток, как у любого синхронного
+представления. Включается настройкой ASYNC_VIEWS, её выставляет
+foodgram/asgi.py; под WSGI представления остаются синхронными.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers import asgi
+from django.db import close_old_connections, connections
+from rest_framework.permissions import SAFE_METHODS
+
+from api.middleware import observe_queries
+
+executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'ASYNC_VIEWS_THREADS', 8),
+    thread_name_prefix='views'
+)
+
+
+def call(view, request, *args, **kwargs):
+    """Выполнить представление и подготовить ответ к отправке.
+
+    Соединения с БД закрываются так же, как в конце обычного запроса:
+    сигнал request_finished до потоков пула не доходит. Потоковый ответ
+    читается позже, в ASGIHandler.
+    """
+    close_old_connections()
+    observe_queries()
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render') and not response.is_rendered:
+            response.render()
+    finally:
+        close_old_connections()
+    return response
+
+
+def offload(view):
+    """Асинхронная обёртка: чтение в пуле, запись в общем потоке"""
+    read = sync_to_async(call, thread_sensitive=False, executor=executor)
+    write = sync_to_async(call)
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return await read(view, request, *args, **kwargs)
+        return await write(view, request, *args, **kwargs)
+
+    return wrapper
+
+
+class AsyncReadMixin:
+    """Представление, которое под ASGI читает в пуле потоков"""
+
+    @classmethod
+    def as_view(cls, *args, **kwargs):
+        view = super().as_view(*args, **kwargs)
+        if getattr(settings, 'ASYNC_VIEWS', False):
+            return offload(view)
+        return view
+
+
+class ASGIHandler(asgi.ASGIHandler):
+    """ASGIHandler, который читает потоковый ответ вне цикла событий.
+
+    Django 3.2 перебирает потоковый ответ прямо в цикле событий, где ORM
+    недоступен. Здесь части ответа читаются по одной в отдельном потоке:
+    курсор генератора живёт в его соединении с БД, и соединения других
+    запросов его не закроют.
+    """
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+        # заголовки - как в ASGIHandler.send_response
+        headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode('ascii')
+            if isinstance(value, str):
+                value = value.encode('latin1')
+            headers.append((bytes(header), bytes(value)))
+        for cookie in response.cookies.values():
+            headers.append((
+                b'Set-Cookie', cookie.output(header='').encode('ascii').strip()
+            ))
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        })
+        parts = iter(response)
+        with ThreadPoolExecutor(max_workers=1) as reader:
+            read = sync_to_async(
+                next, thread_sensitive=False, executor=reader
+            )
+            try:
+                while True:
+                    part = await read(parts, None)
+                    if part is None:
+                        break
+                    for chunk, _ in self.chunk_bytes(part):
+                        await send({
+                            'type': 'http.response.body',
+                            'body': chunk,
+                            'more_body': True,
+                        })
+            finally:
+                await sync_to_async(
+                    connections.close_all,
+                    thread_sensitive=False, executor=reader
+                )()
+        await send({'type': 'http.response.body'})
+        await sync_to_async(response.close, thread_sensitive=True)()
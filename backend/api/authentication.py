@@ -0,0 +1,136 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+TOKEN_KEY = 'auth:token:{}'
+
+
+def cache_key(token_key):
+    # сам токен в ключ кэша не попадает
+    return TOKEN_KEY.format(hashlib.sha256(token_key.encode()).hexdigest())
+
+
+class LocalCache:
+    """Ограниченный LRU-кэш процесса с временем жизни записей"""
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if not self.size:
+            return
+        with self.lock:
+            self.items[key] = (time.monotonic() + self.timeout, value)
+            self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.items.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+local_tokens = LocalCache(
+    getattr(settings, 'AUTH_TOKEN_CACHE_SIZE', 10000),
+    getattr(settings, 'AUTH_TOKEN_CACHE_LOCAL_TIMEOUT', 5),
+)
+
+# кэши, которые видит только текущий процесс
+LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def shared_cache():
+    """Кэш Django, если он общий для всех процессов, иначе None"""
+    shared = getattr(settings, 'AUTH_TOKEN_SHARED_CACHE', None)
+    if shared is None:
+        shared = settings.CACHES['default']['BACKEND'] not in LOCAL_BACKENDS
+    return cache if shared else None
+
+
+def forget(token_key):
+    """Убрать токен из LRU процесса: изменился его пользователь"""
+    local_tokens.delete(cache_key(token_key))
+
+
+def invalidate(token_key):
+    """Забыть удалённый токен"""
+    forget(token_key)
+    shared = shared_cache()
+    if shared is not None:
+        shared.delete(cache_key(token_key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication без поиска токена в БД на каждый запрос.
+
+    Пользователь и токен хранятся в LRU процесса не дольше
+    AUTH_TOKEN_CACHE_LOCAL_TIMEOUT секунд, после этого пользователь
+    заново читается по первичному ключу и снова проверяется is_active.
+    Так деактивация через QuerySet.update и изменения в других
+    процессах видны через несколько секунд; сигналы сбрасывают LRU
+    только своего процесса.
+    Если кэш Django общий для процессов (не LocMemCache), в нём лежит
+    пара (id пользователя, ключ токена), строка пользователя туда
+    не попадает. Удалённый токен убирается и оттуда.
+    """
+    timeout = getattr(settings, 'AUTH_TOKEN_CACHE_TIMEOUT', 60 * 5)
+
+    def authenticate_credentials(self, key):
+        name = cache_key(key)
+        credentials = local_tokens.get(name)
+        if credentials is None:
+            credentials = self.load_credentials(name, key)
+            local_tokens.set(name, credentials)
+        # каждый запрос получает свою копию, общий объект могли бы
+        # изменить из другого потока
+        token = copy.copy(credentials[1])
+        user = token.user = copy.copy(credentials[0])
+        return user, token
+
+    def load_credentials(self, name, key):
+        shared = shared_cache()
+        ids = shared.get(name) if shared is not None else None
+        if ids is None:
+            user, token = super().authenticate_credentials(key)
+            if shared is not None:
+                shared.set(name, (user.pk, token.key), self.timeout)
+            return user, token
+        user_id, token_key = ids
+        user = get_user_model().objects.filter(pk=user_id).first()
+        if user is None or not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                'Пользователь неактивен или удалён.'
+            )
+        token = self.get_model()(key=token_key, user_id=user_id)
+        token.user = user
+        return user, token
@@ -0,0 +1,224 @@
+import hashlib
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import (
+    get_conditional_response, patch_vary_headers, quote_etag
+)
+from rest_framework.response import Response
+
+from api import metrics
+
+LIST_VERSION = 'recipes:version:list'
+SHARED_VERSION = 'recipes:version:shared'
+RECIPE_VERSION = 'recipes:version:recipe:{}'
+USER_VERSION = 'recipes:version:user:{}'
+TAGS_VERSION = 'tags:version'
+INGREDIENTS_VERSION = 'ingredients:version'
+COUNTERS_VERSION = 'recipes:version:counters'
+COUNTERS_SNAPSHOT = 'recipes:version:counters:snapshot'
+
+
+def version_timeout():
+    # истёкшая версия создаётся заново и только сбрасывает кэш и ETag
+    return getattr(settings, 'CACHE_VERSION_TIMEOUT', 60 * 60 * 24)
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # начальное значение не должно совпасть с версией до вытеснения
+        cache.add(key, time.time_ns(), version_timeout())
+        version = cache.get(key)
+    return version
+
+
+def increment(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), version_timeout())
+
+
+def bump_version(key):
+    """Сменить версию, когда текущая транзакция зафиксируется.
+
+    Если сменить раньше, параллельный запрос прочитает данные до
+    фиксации и закэширует их уже под новой версией.
+    """
+    transaction.on_commit(partial(increment, key))
+
+
+def recipes_changed(recipe_id=None):
+    """Сбросить кэш списков и, если передан id, кэш одного рецепта"""
+    bump_version(LIST_VERSION)
+    if recipe_id is not None:
+        bump_version(RECIPE_VERSION.format(recipe_id))
+
+
+def counters_changed(recipe_ids):
+    """Изменились счётчики рецептов, например число добавлений в избранное.
+
+    Кэш самих рецептов сбрасывается сразу, списков - через
+    counters_version, не чаще раза в RECIPES_COUNTERS_DELAY секунд:
+    иначе каждое добавление в избранное сбрасывало бы кэш всех списков.
+    """
+    bump_version(COUNTERS_VERSION)
+    for recipe_id in recipe_ids:
+        bump_version(RECIPE_VERSION.format(recipe_id))
+
+
+def counters_version():
+    """Версия счётчиков для списков, обновляется с задержкой.
+
+    Снимок COUNTERS_VERSION живёт RECIPES_COUNTERS_DELAY секунд, так что
+    списки показывают счётчики и порядок по ним с задержкой не больше
+    этого времени.
+    """
+    snapshot = cache.get(COUNTERS_SNAPSHOT)
+    if snapshot is None:
+        cache.add(
+            COUNTERS_SNAPSHOT, get_version(COUNTERS_VERSION),
+            getattr(settings, 'RECIPES_COUNTERS_DELAY', 60)
+        )
+        snapshot = cache.get(COUNTERS_SNAPSHOT)
+    return snapshot
+
+
+def shared_changed():
+    """Изменились теги, авторы или ингредиенты - сбросить весь кэш"""
+    bump_version(LIST_VERSION)
+    bump_version(SHARED_VERSION)
+
+
+def user_changed(user_id):
+    """Изменились избранное, корзина или подписки пользователя"""
+    bump_version(USER_VERSION.format(user_id))
+
+
+def digest(request, *parts):
+    params = sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values
+    )
+    raw = repr((request.get_host(), parts, params)).encode()
+    return hashlib.md5(raw).hexdigest()
+
+
+def make_key(request, *parts):
+    return 'recipes:response:' + digest(request, *parts)
+
+
+class AnonymousCacheMixin:
+    """Кэширует ответы list и retrieve для анонимных пользователей.
+
+    Ответ не зависит от посетителя, поэтому ключ строится только из
+    параметров запроса и версий, которые сбрасываются сигналами.
+    """
+    cache_timeout = getattr(settings, 'RECIPES_CACHE_TIMEOUT', 60 * 15)
+
+    def cached_response(self, request, key, get_response):
+        if not request.user.is_anonymous:
+            return get_response()
+        data = cache.get(key)
+        metrics.cache_lookup('response', data is not None)
+        if data is not None:
+            return Response(data)
+        response = get_response()
+        if response.status_code == 200:
+            cache.set(key, response.data, self.cache_timeout)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        key = make_key(
+            request, 'list', get_version(LIST_VERSION), counters_version()
+        )
+        return self.cached_response(
+            request, key, partial(super().list, request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        key = make_key(
+            request, 'detail', pk,
+            get_version(RECIPE_VERSION.format(pk)),
+            get_version(SHARED_VERSION)
+        )
+        return self.cached_response(
+            request, key, partial(super().retrieve, request, *args, **kwargs)
+        )
+
+
+class ConditionalGetMixin:
+    """ETag для list и retrieve без выполнения сериализатора.
+
+    ETag строится из версий, от которых зависит ответ (их возвращает
+    get_etag_versions), поэтому на If-None-Match ответ 304 отдаётся
+    до любых запросов к БД.
+    """
+
+    def get_etag_versions(self, request, **kwargs):
+        raise NotImplementedError
+
+    def conditional_response(self, request, get_response, **kwargs):
+        etag = quote_etag(digest(
+            request,
+            request.path,
+            request.META.get('HTTP_ACCEPT'),
+            self.get_etag_versions(request, **kwargs)
+        ))
+        response = get_conditional_response(request, etag=etag)
+        if request.META.get('HTTP_IF_NONE_MATCH'):
+            metrics.cache_lookup('etag', response is not None)
+        if response is None:
+            response = get_response()
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+        patch_vary_headers(response, ('Accept', 'Authorization'))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, partial(super().list, request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request,
+            partial(super().retrieve, request, *args, **kwargs),
+            **kwargs
+        )
+
+
+class RecipesConditionalGetMixin(ConditionalGetMixin):
+
+    def get_etag_versions(self, request, **kwargs):
+        if kwargs:
+            pk = kwargs[self.lookup_url_kwarg or self.lookup_field]
+            versions = [
+                get_version(RECIPE_VERSION.format(pk)),
+                get_version(SHARED_VERSION),
+            ]
+        else:
+            versions = [get_version(LIST_VERSION), counters_version()]
+        # признаки избранного, корзины и подписки зависят от пользователя
+        user = request.user
+        if user.is_authenticated:
+            versions += [user.pk, get_version(USER_VERSION.format(user.pk))]
+        return versions
+
+
+class TagsConditionalGetMixin(ConditionalGetMixin):
+
+    def get_etag_versions(self, request, **kwargs):
+        return [get_version(TAGS_VERSION)]
+
+
+class IngredientsConditionalGetMixin(ConditionalGetMixin):
+
+    def get_etag_versions(self, request, **kwargs):
+        return [get_version(INGREDIENTS_VERSION)]
@@ -0,0 +1,29 @@
+import hashlib
+import os
+
+from django.core.files.storage import default_storage
+from drf_extra_fields.fields import Base64ImageField
+
+
+class HashedBase64ImageField(Base64ImageField):
+    """Картинка в base64, файл которой называется по хэшу содержимого.
+
+    Если такая картинка уже загружалась, возвращается имя готового
+    файла, и повторно он не сохраняется.
+    """
+
+    def __init__(self, *args, upload_to='', **kwargs):
+        self.upload_to = upload_to
+        super().__init__(*args, **kwargs)
+
+    def get_file_name(self, decoded_file):
+        return hashlib.sha256(decoded_file).hexdigest()
+
+    def to_internal_value(self, base64_data):
+        file = super().to_internal_value(base64_data)
+        if file is None:
+            return file
+        name = os.path.join(self.upload_to, file.name)
+        if default_storage.exists(name):
+            return name
+        return file
@@ -19,6 +19,10 @@ class Fav_Cart_Filter(rest_framework.FilterSet):
     is_in_shopping_cart = rest_framework.filters.BooleanFilter(
         method='shopping_cart'
     )
+    ordering = rest_framework.filters.ChoiceFilter(
+        choices=(('popular', 'По числу добавлений в избранное'),),
+        method='order'
+    )
 
     class Meta:
         model = Recipes
@@ -26,7 +30,8 @@ class Fav_Cart_Filter(rest_framework.FilterSet):
             'author',
             'tags',
             'is_favorited',
-            'is_in_shopping_cart'
+            'is_in_shopping_cart',
+            'ordering'
         )
 
     def favorited(self, queryset, name, value):
@@ -39,6 +44,10 @@ class Fav_Cart_Filter(rest_framework.FilterSet):
             return queryset.filter(shopping_cart__user=self.request.user)
         return queryset
 
+    def order(self, queryset, name, value):
+        # индекс recipes_popular_idx
+        return queryset.order_by('-favorites_count', '-id')
+
 
 class FilterIngredients(rest_framework.FilterSet):
     """Фильтр для ингредиентов"""
@@ -0,0 +1,155 @@
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredients, Recipes
+
+# (вес, название, нужна ли авторизация, шаблон адреса)
+TRAFFIC = (
+    (25, 'recipes_list_anonymous', False, '/api/recipes/?page={page}'),
+    (15, 'recipes_list', True, '/api/recipes/?page={page}'),
+    (8, 'recipes_by_tag', True, '/api/recipes/?tags={tag}&page={page}'),
+    (4, 'recipes_favorited', True, '/api/recipes/?is_favorited=1'),
+    (15, 'recipe_detail', True, '/api/recipes/{recipe}/'),
+    (10, 'ingredients_search', False, '/api/ingredients/?name={prefix}'),
+    (5, 'tags', False, '/api/tags/'),
+    (6, 'subscriptions', True,
+     '/api/users/subscriptions/?recipes_limit=3'),
+    (3, 'users', True, '/api/users/'),
+    (2, 'download_shopping_cart', True,
+     '/api/recipes/download_shopping_cart/'),
+)
+TAGS = ('breakfast', 'lunch', 'dinner')
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(share * (len(ordered) - 1)))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    """Нагрузочный прогон API внутри процесса.
+
+    Запросы из взвешенной смеси TRAFFIC отправляются через тестовый
+    клиент Django из нескольких потоков. Результат - задержки p50/p95/p99,
+    пропускная способность и число запросов к БД на каждый эндпоинт
+    в формате JSON, чтобы сравнивать прогоны между коммитами.
+    """
+
+    help = 'replay a weighted traffic mix and report latency as json'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--label', default='')
+        parser.add_argument('--output', help='Файл для JSON-отчёта')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        tokens = list(
+            Token.objects.values_list('key', flat=True)[:options['users']]
+        )
+        recipes = list(Recipes.objects.values_list('id', flat=True)[:5000])
+        prefixes = list({
+            name[:2] for name in Ingredients.objects.values_list(
+                'name', flat=True
+            )[:2000]
+        })
+        if not tokens or not recipes or not prefixes:
+            raise CommandError('Сначала сгенерируйте данные: generate_data')
+        pages = max(1, min(len(recipes) // 6, 50))
+        weights = [weight for weight, *_ in TRAFFIC]
+        plan = [
+            self.build(
+                self.random.choices(TRAFFIC, weights)[0],
+                tokens, recipes, prefixes, pages
+            )
+            for _ in range(options['requests'])
+        ]
+        results = defaultdict(list)
+        lock = threading.Lock()
+
+        def run(item):
+            name, token, url = item
+            client = APIClient()
+            if token:
+                client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = client.get(url)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                elapsed = time.perf_counter() - started
+            with lock:
+                results[name].append(
+                    (elapsed, len(queries), response.status_code < 400)
+                )
+
+        def worker(chunk):
+            try:
+                for item in chunk:
+                    run(item)
+            finally:
+                connections.close_all()
+
+        threads = options['threads']
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(
+                worker, [plan[index::threads] for index in range(threads)]
+            ))
+        duration = time.perf_counter() - started
+        report = {
+            'label': options['label'],
+            'requests': len(plan),
+            'threads': threads,
+            'duration_s': round(duration, 3),
+            'throughput_rps': round(len(plan) / duration, 1),
+            'overall': self.summary(
+                [row for rows in results.values() for row in rows]
+            ),
+            'endpoints': {
+                name: self.summary(rows)
+                for name, rows in sorted(results.items())
+            },
+        }
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        self.stdout.write(output)
+
+    def build(self, traffic, tokens, recipes, prefixes, pages):
+        _, name, authorized, template = traffic
+        url = template.format(
+            page=self.random.randint(1, pages),
+            tag=self.random.choice(TAGS),
+            recipe=self.random.choice(recipes),
+            prefix=self.random.choice(prefixes),
+        )
+        return name, self.random.choice(tokens) if authorized else None, url
+
+    def summary(self, rows):
+        timings = [elapsed * 1000 for elapsed, _, _ in rows]
+        return {
+            'count': len(rows),
+            'errors': sum(1 for *_, ok in rows if not ok),
+            'p50_ms': round(percentile(timings, 0.50), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'p99_ms': round(percentile(timings, 0.99), 2),
+            'queries_avg': round(
+                sum(queries for _, queries, _ in rows) / len(rows), 2
+            ),
+        }
@@ -0,0 +1,80 @@
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.authentication import CachedTokenAuthentication, local_tokens
+
+
+class Command(BaseCommand):
+    """Сравнение проверки токена: запрос к БД против кэша токенов."""
+
+    help = 'compare TokenAuthentication and CachedTokenAuthentication'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tokens', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        keys = list(
+            Token.objects.values_list('key', flat=True)[:options['tokens']]
+        )
+        if not keys:
+            raise CommandError('Сначала сгенерируйте данные: generate_data')
+        factory = APIRequestFactory()
+        requests = [
+            Request(factory.get('/', HTTP_AUTHORIZATION=f'Token {key}'))
+            for key in keys
+        ]
+
+        def measure(authentication):
+            timings = []
+            with CaptureQueriesContext(connection) as queries:
+                for _ in range(options['repeat']):
+                    for request in requests:
+                        started = time.perf_counter()
+                        authentication.authenticate(request)
+                        timings.append(time.perf_counter() - started)
+            return (
+                statistics.median(timings) * 10 ** 6,
+                len(queries) / len(timings)
+            )
+
+        cache.clear()
+        local_tokens.clear()
+        rows = (
+            ('TokenAuthentication', measure(TokenAuthentication())),
+            ('CachedTokenAuthentication',
+             measure(CachedTokenAuthentication())),
+        )
+        local_tokens.clear()
+        rows += (
+            ('  только общий кэш', measure(self.shared_only())),
+        )
+        self.stdout.write(
+            f'{len(keys)} токенов по {options["repeat"]} раз, медиана:'
+        )
+        for name, (micros, queries) in rows:
+            self.stdout.write(
+                f'  {name:<27} {micros:8.1f} мкс, '
+                f'запросов к БД: {queries:.2f}'
+            )
+
+    def shared_only(self):
+        """Проверка без LRU процесса, как в другом процессе gunicorn"""
+        authentication = CachedTokenAuthentication()
+        authenticate = authentication.authenticate
+
+        def without_local(request):
+            local_tokens.clear()
+            return authenticate(request)
+
+        authentication.authenticate = without_local
+        return authentication
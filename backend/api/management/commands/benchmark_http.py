@@ -0,0 +1,171 @@
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from urllib.parse import quote, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from api.management.commands.benchmark_api import TAGS, TRAFFIC, percentile
+from api.management.commands.generate_data import WORDS
+from recipes.models import Ingredients, Recipes
+
+# чтение, которое под ASGI обслуживается api.async_views,
+# и поиск как пример медленного запроса
+READS = tuple(
+    traffic for traffic in TRAFFIC
+    if traffic[1] not in ('users', 'download_shopping_cart')
+) + (
+    (5, 'recipes_search', False, '/api/recipes/?search={word}'),
+)
+
+
+class Command(BaseCommand):
+    """Пропускная способность запущенного сервера при многих соединениях.
+
+    Держит --connections соединений HTTP/1.1 и в течение --duration
+    секунд шлёт по ним GET-запросы из смеси READS; если сервер закрывает
+    соединение после ответа, оно открывается заново и время соединения
+    входит в задержку. Сервер запускается отдельно с тем же числом
+    процессов, например:
+        gunicorn foodgram.wsgi -w 2
+        gunicorn foodgram.asgi -w 2 -k uvicorn.workers.UvicornWorker
+    """
+
+    help = 'replay read traffic over many connections against a server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--connections', type=int, default=64)
+        parser.add_argument('--duration', type=float, default=20)
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--label', default='')
+        parser.add_argument('--output', help='Файл для JSON-отчёта')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.tokens = list(
+            Token.objects.values_list('key', flat=True)[:options['users']]
+        )
+        self.recipes = list(
+            Recipes.objects.values_list('id', flat=True)[:5000]
+        )
+        self.prefixes = list({
+            name[:2] for name in Ingredients.objects.values_list(
+                'name', flat=True
+            )[:2000]
+        })
+        if not self.tokens or not self.recipes or not self.prefixes:
+            raise CommandError('Сначала сгенерируйте данные: generate_data')
+        self.pages = max(1, min(len(self.recipes) // 6, 50))
+        self.weights = [weight for weight, *_ in READS]
+        url = urlsplit(options['url'])
+        self.host, self.port = url.hostname, url.port or 80
+        self.timeout = options['timeout']
+        results = defaultdict(list)
+        started = time.perf_counter()
+        asyncio.run(self.load(
+            options['connections'], started + options['duration'], results
+        ))
+        duration = time.perf_counter() - started
+        total = sum(len(rows) for rows in results.values())
+        report = {
+            'label': options['label'],
+            'connections': options['connections'],
+            'requests': total,
+            'duration_s': round(duration, 3),
+            'throughput_rps': round(total / duration, 1),
+            'overall': self.summary(
+                [row for rows in results.values() for row in rows]
+            ),
+            'endpoints': {
+                name: self.summary(rows)
+                for name, rows in sorted(results.items())
+            },
+        }
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        self.stdout.write(output)
+
+    def build(self):
+        _, name, authorized, template = self.random.choices(
+            READS, self.weights
+        )[0]
+        url = quote(template.format(
+            page=self.random.randint(1, self.pages),
+            tag=self.random.choice(TAGS),
+            recipe=self.random.choice(self.recipes),
+            prefix=self.random.choice(self.prefixes),
+            word=self.random.choice(WORDS),
+        ), safe='/?=&')
+        headers = f'Host: {self.host}\r\n'
+        if authorized:
+            token = self.random.choice(self.tokens)
+            headers += f'Authorization: Token {token}\r\n'
+        return name, f'GET {url} HTTP/1.1\r\n{headers}\r\n'.encode()
+
+    async def load(self, connections, deadline, results):
+        await asyncio.gather(*(
+            self.client(deadline, results) for _ in range(connections)
+        ))
+
+    async def client(self, deadline, results):
+        reader = writer = None
+        while time.perf_counter() < deadline:
+            name, request = self.build()
+            started = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(
+                        self.host, self.port
+                    )
+                writer.write(request)
+                status, keep_alive = await asyncio.wait_for(
+                    self.read_response(reader), self.timeout
+                )
+            except (
+                OSError, asyncio.IncompleteReadError, asyncio.TimeoutError
+            ):
+                status, keep_alive = None, False
+            results[name].append((time.perf_counter() - started, status))
+            if not keep_alive and writer is not None:
+                writer.close()
+                writer = None
+        if writer is not None:
+            writer.close()
+
+    async def read_response(self, reader):
+        head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1')
+        status_line, *lines = head.split('\r\n')
+        headers = {}
+        for line in lines:
+            if ':' in line:
+                key, value = line.split(':', 1)
+                headers[key.strip().lower()] = value.strip().lower()
+        if headers.get('transfer-encoding') == 'chunked':
+            size = None
+            while size != 0:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                await reader.readexactly(size + 2)
+        else:
+            await reader.readexactly(int(headers.get('content-length', 0)))
+        keep_alive = headers.get('connection') != 'close'
+        return int(status_line.split()[1]), keep_alive
+
+    def summary(self, rows):
+        timings = [elapsed * 1000 for elapsed, _ in rows]
+        return {
+            'count': len(rows),
+            'errors': sum(
+                1 for _, status in rows if status is None or status >= 400
+            ),
+            'p50_ms': round(percentile(timings, 0.50), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'p99_ms': round(percentile(timings, 0.99), 2),
+        }
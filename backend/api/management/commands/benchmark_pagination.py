@@ -0,0 +1,56 @@
+import statistics
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.paginations import RecipesPagination
+from recipes.models import Recipes
+
+
+class Command(BaseCommand):
+    """Сравнение скорости дальней страницы рецептов: номер страницы
+    (COUNT(*) и OFFSET) против курсора."""
+
+    help = 'compare page number and keyset pagination of recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page', type=int, default=1000)
+        parser.add_argument('--limit', type=int, default=6)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        page, limit = options['page'], options['limit']
+        if Recipes.objects.count() < page * limit:
+            raise CommandError(
+                f'Для страницы {page} нужно хотя бы {page * limit} рецептов'
+            )
+        factory = APIRequestFactory()
+        queryset = Recipes.objects.for_read(AnonymousUser())
+        # курсор, указывающий на начало нужной страницы
+        paginator = RecipesPagination()
+        last = queryset.order_by(*paginator.ordering)[(page - 1) * limit - 1]
+        cursor = paginator.encode_cursor([last.pub_date, last.id])
+
+        def measure(params):
+            timings = []
+            for _ in range(options['repeat']):
+                request = Request(factory.get('/api/recipes/', params))
+                started = time.perf_counter()
+                results = RecipesPagination().paginate_queryset(
+                    queryset, request
+                )
+                timings.append(time.perf_counter() - started)
+            return results, statistics.median(timings) * 1000
+
+        by_number, number_ms = measure({'page': page, 'limit': limit})
+        by_cursor, cursor_ms = measure({'cursor': cursor, 'limit': limit})
+        if [recipe.id for recipe in by_number] != [
+            recipe.id for recipe in by_cursor
+        ]:
+            raise CommandError('Страницы по номеру и по курсору не совпали')
+        self.stdout.write(f'Страница {page} по {limit} рецептов, медиана:')
+        self.stdout.write(f'  номер страницы: {number_ms:.2f} мс')
+        self.stdout.write(f'  курсор:         {cursor_ms:.2f} мс')
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from api.services.images import make_variants, mark_ready
+from recipes.models import Recipes
+
+
+class Command(BaseCommand):
+    """Подготовка уменьшенных копий для уже загруженных картинок."""
+
+    help = 'build resized variants of recipe images'
+
+    def handle(self, *args, **options):
+        names = (
+            Recipes.objects.exclude(image='').
+            values_list('image', flat=True).order_by().distinct().iterator()
+        )
+        done = failed = 0
+        for name in names:
+            try:
+                make_variants(name)
+                mark_ready(name)
+            except (OSError, ValueError) as error:
+                failed += 1
+                self.stderr.write(f'{name}: {error}')
+                continue
+            done += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {done}, с ошибками: {failed}'
+        ))
@@ -0,0 +1,228 @@
+import random
+import time
+from itertools import accumulate
+from io import BytesIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from api import caching
+from api.services import favorites, feed, search, shopping_list
+from recipes.models import (
+    Favorites, Ingredients, Recipes, RecipesIngredients, ShoppingCart, Tag,
+    CHOICES_COLOR, CHOICES_NAME, CHOICES_SLUG
+)
+from users.models import Subscribtion, User
+
+IMAGE_NAME = 'recipes/generated.png'
+PASSWORD = 'generated-password'
+WORDS = (
+    'суп', 'салат', 'пирог', 'паста', 'рагу', 'омлет', 'каша', 'запеканка',
+    'быстрый', 'домашний', 'острый', 'сырный', 'овощной', 'куриный',
+    'рыбный', 'летний', 'зимний', 'бабушкин', 'праздничный', 'лёгкий',
+)
+
+
+def zipf_weights(count, exponent):
+    """Веса с длинным хвостом: немногие объекты получают почти всё"""
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+class Command(BaseCommand):
+    """Генерация синтетических данных для нагрузочных тестов.
+
+    Популярность авторов и рецептов распределена по закону Ципфа:
+    у немногих авторов много рецептов и подписчиков, немногие рецепты
+    почти у всех в избранном.
+    """
+
+    help = 'generate users, recipes, favorites, carts and subscriptions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--favorites-per-user', type=int, default=20)
+        parser.add_argument('--cart-per-user', type=int, default=5)
+        parser.add_argument('--subscriptions-per-user', type=int, default=10)
+        parser.add_argument('--skew', type=float, default=1.1)
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        ingredient_ids = list(Ingredients.objects.values_list('id', flat=True))
+        if not ingredient_ids:
+            raise CommandError('Сначала загрузите ингредиенты: load_data')
+        started = time.monotonic()
+        run = f'{int(time.time())}'
+        with transaction.atomic():
+            tags = self.create_tags()
+            users = self.create_users(options['users'], run)
+            recipes = self.create_recipes(
+                options['recipes'], users, run, options['skew']
+            )
+            self.create_recipe_links(
+                recipes, ingredient_ids, tags,
+                options['ingredients_per_recipe']
+            )
+            self.create_user_links(users, recipes, options)
+        shopping_list.rebuild(users)
+        search.rebuild(recipes, self.batch_size)
+        feed.rebuild(users)
+        favorites.reconcile(self.batch_size)
+        caching.shared_changed()
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(users)}, рецептов: {len(recipes)} '
+            f'за {time.monotonic() - started:.1f} с. '
+            f'Пароль пользователей: {PASSWORD}'
+        ))
+
+    def create_tags(self):
+        for (name, _), (color, _), (slug, _) in zip(
+            CHOICES_NAME, CHOICES_COLOR, CHOICES_SLUG
+        ):
+            Tag.objects.get_or_create(
+                slug=slug, defaults={'name': name, 'color': color}
+            )
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def create_users(self, count, run):
+        password = make_password(PASSWORD)
+        User.objects.bulk_create(
+            [
+                User(
+                    username=f'gen{run}_{number}',
+                    email=f'gen{run}_{number}@foodgram.ru',
+                    first_name='Тест',
+                    last_name=f'Пользователь {number}',
+                    password=password,
+                )
+                for number in range(count)
+            ],
+            batch_size=self.batch_size
+        )
+        users = list(
+            User.objects.filter(username__startswith=f'gen{run}_').
+            order_by('id').values_list('id', flat=True)
+        )
+        Token.objects.bulk_create(
+            [Token(key=Token.generate_key(), user_id=pk) for pk in users],
+            batch_size=self.batch_size
+        )
+        return users
+
+    def create_recipes(self, count, users, run, skew):
+        if not default_storage.exists(IMAGE_NAME):
+            buffer = BytesIO()
+            Image.new('RGB', (600, 400), '#E26C2D').save(buffer, 'PNG')
+            default_storage.save(IMAGE_NAME, ContentFile(buffer.getvalue()))
+        authors = self.random.choices(
+            users, zipf_weights(len(users), skew), k=count
+        )
+        Recipes.objects.bulk_create(
+            [
+                Recipes(
+                    author_id=author,
+                    name=f'{" ".join(self.random.sample(WORDS, 3))} '
+                         f'{run}-{number}',
+                    image=IMAGE_NAME,
+                    text=' '.join(self.random.choices(WORDS, k=30)),
+                    cooking_time=self.random.randint(5, 180),
+                )
+                for number, author in enumerate(authors)
+            ],
+            batch_size=self.batch_size
+        )
+        return list(
+            Recipes.objects.filter(name__contains=f' {run}-').
+            order_by('id').values_list('id', flat=True)
+        )
+
+    def create_recipe_links(self, recipes, ingredient_ids, tags, per_recipe):
+        per_recipe = min(per_recipe, len(ingredient_ids))
+        RecipesIngredients.objects.bulk_create(
+            (
+                RecipesIngredients(
+                    recipes_id=recipe,
+                    ingredients_id=ingredient,
+                    amount=self.random.randint(1, 500),
+                )
+                for recipe in recipes
+                for ingredient in self.random.sample(
+                    ingredient_ids, per_recipe
+                )
+            ),
+            batch_size=self.batch_size
+        )
+        Recipes.tags.through.objects.bulk_create(
+            (
+                Recipes.tags.through(recipes_id=recipe, tag_id=tag)
+                for recipe in recipes
+                for tag in self.random.sample(
+                    tags, self.random.randint(1, len(tags))
+                )
+            ),
+            batch_size=self.batch_size
+        )
+
+    def pick(self, population, cum_weights, count):
+        """Несколько разных объектов с учётом популярности.
+
+        Два раунда выборки с весами, остаток добирается без повторов
+        через random.sample: когда count близок к размеру population,
+        выборка с весами почти всегда попадает в уже выбранные.
+        """
+        count = min(count, len(population))
+        chosen = set()
+        for _ in range(2):
+            chosen.update(self.random.choices(
+                population, cum_weights=cum_weights, k=count - len(chosen)
+            ))
+        if len(chosen) < count:
+            # среди count разных объектов хватит невыбранных
+            for item in self.random.sample(population, count):
+                chosen.add(item)
+                if len(chosen) == count:
+                    break
+        return chosen
+
+    def create_user_links(self, users, recipes, options):
+        # накопленные веса считаются один раз, а не при каждой выборке
+        recipe_weights = list(
+            accumulate(zipf_weights(len(recipes), options['skew']))
+        )
+        author_weights = list(
+            accumulate(zipf_weights(len(users), options['skew']))
+        )
+        for model, per_user in (
+            (Favorites, options['favorites_per_user']),
+            (ShoppingCart, options['cart_per_user']),
+        ):
+            model.objects.bulk_create(
+                (
+                    model(user_id=user, recipe_id=recipe)
+                    for user in users
+                    for recipe in self.pick(recipes, recipe_weights, per_user)
+                ),
+                batch_size=self.batch_size,
+                ignore_conflicts=True
+            )
+        Subscribtion.objects.bulk_create(
+            (
+                Subscribtion(user_id=user, author_id=author)
+                for user in users
+                for author in self.pick(
+                    users, author_weights,
+                    options['subscriptions_per_user']
+                )
+                if author != user
+            ),
+            batch_size=self.batch_size
+        )
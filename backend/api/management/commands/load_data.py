@@ -1,31 +1,150 @@
 import csv
+import json
+import os
+import time
 
-
+from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
-from django.db.utils import IntegrityError
+from django.db import transaction
 
+from api import caching
+from api.services.ingredient_index import ingredient_index
 from recipes.models import Ingredients
 
+DEFAULT_PATH = os.path.join(
+    settings.BASE_DIR, 'api', 'data', 'ingredients.csv'
+)
+HEADER = ('name', 'measurement_unit')
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if tuple(row) == HEADER:
+            continue
+        name, measurement_unit = row
+        yield name, measurement_unit
+
+
+def read_json(file, chunk_size=64 * 1024):
+    """Читает JSON-массив объектов по частям, не загружая файл целиком"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    for chunk in iter(lambda: file.read(chunk_size), ''):
+        buffer += chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if not started and buffer[position:position + 1] == '[':
+                started = True
+                position += 1
+                continue
+            if buffer[position:position + 1] == ']':
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except ValueError:
+                # объект ещё не дочитан целиком
+                break
+            yield item['name'], item['measurement_unit']
+        buffer = buffer[position:]
+    if buffer.strip():
+        raise ValueError('файл обрывается посреди записи')
+
+
+READERS = {
+    '.csv': read_csv,
+    '.json': read_json,
+}
+
 
 class Command(BaseCommand):
-    """Скрипт для загрузки ингредиентов в БД на сервере."""
+    """Скрипт для загрузки ингредиентов в БД на сервере.
+
+    Уже существующие ингредиенты пропускаются, поэтому прерванную
+    загрузку можно просто запустить ещё раз. bulk_create не отправляет
+    сигналы, поэтому кэш ответов и индекс автодополнения сбрасываются
+    после загрузки явно.
+    """
 
-    help = 'loading ingredients from data in json'
+    help = 'loading ingredients from csv or json'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default=DEFAULT_PATH,
+            help='Путь к файлу .csv или .json'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько ингредиентов записывать одним запросом'
+        )
 
     def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        path = options['path']
+        batch_size = options['batch_size']
+        reader = READERS.get(os.path.splitext(path)[1].lower())
+        if reader is None:
+            raise CommandError('Поддерживаются только файлы .csv и .json')
+        known = set(
+            Ingredients.objects.values_list('name', 'measurement_unit')
+        )
+        created = skipped = 0
+        started = time.monotonic()
         try:
-            with open('api/data/ingredients.csv', 'r',
-                      encoding='utf-8') as file:
-                file_reader = csv.reader(file)
-                for row in file_reader:
-                    name, measurement_unit = row
-                    try:
-                        Ingredients.objects.get_or_create(
-                            name=name,
-                            measurement_unit=measurement_unit
-                        )
-                    except IntegrityError:
-                        print(f'Ингредиент {name} {measurement_unit} '
-                              f'уже есть в базе')
+            with open(path, 'r', encoding='utf-8') as file:
+                batch = []
+                for row in reader(file):
+                    if row in known:
+                        skipped += 1
+                        continue
+                    known.add(row)
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        inserted = self.save_batch(batch)
+                        created += inserted
+                        skipped += len(batch) - inserted
+                        batch = []
+                inserted = self.save_batch(batch)
+                created += inserted
+                skipped += len(batch) - inserted
         except FileNotFoundError:
-            raise CommandError('Файл отсутствует в директории data')
+            raise CommandError(f'Файл {path} не найден')
+        except (ValueError, KeyError) as error:
+            raise CommandError(f'Ошибка в данных файла {path}: {error}')
+        finally:
+            if created:
+                self.catalog_changed()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Добавлено ингредиентов: {created}, уже были в базе: {skipped}, '
+            f'{(created + skipped) / max(elapsed, 1e-6):.0f} строк/с'
+        ))
+
+    def catalog_changed(self):
+        caching.bump_version(caching.INGREDIENTS_VERSION)
+        caching.shared_changed()
+        # остальные процессы перечитают индекс через REBUILD_INTERVAL
+        ingredient_index.build()
+
+    def save_batch(self, batch):
+        """Записать пачку, вернуть число действительно добавленных строк"""
+        if not batch:
+            return 0
+        with transaction.atomic():
+            before = Ingredients.objects.count()
+            Ingredients.objects.bulk_create(
+                [
+                    Ingredients(name=name, measurement_unit=measurement_unit)
+                    for name, measurement_unit in batch
+                ],
+                batch_size=len(batch),
+                ignore_conflicts=True
+            )
+            # ignore_conflicts молча пропускает строки, добавленные
+            # параллельно, а bulk_create возвращает все объекты
+            inserted = Ingredients.objects.count() - before
+        if self.verbosity > 1:
+            self.stdout.write(f'Записано {inserted} ингредиентов')
+        return inserted
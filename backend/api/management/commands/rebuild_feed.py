@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.services import feed
+
+
+class Command(BaseCommand):
+    """Пересборка лент подписок из подписок и рецептов."""
+
+    help = 'rebuild subscription feed timelines'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        count = feed.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей в лентах: {count} '
+            f'за {time.monotonic() - started:.1f} с'
+        ))
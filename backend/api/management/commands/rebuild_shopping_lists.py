@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services import shopping_list
+
+
+class Command(BaseCommand):
+    """Пересборка и сверка сохранённых списков покупок с корзинами."""
+
+    help = 'rebuild shopping lists from shopping carts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только сверить списки с корзинами, ничего не меняя'
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            count = shopping_list.rebuild()
+            self.stdout.write(self.style.SUCCESS(
+                f'Списки покупок пересобраны, строк: {count}'
+            ))
+            return
+        live = shopping_list.live_totals()
+        stored = shopping_list.stored_totals()
+        wrong = {
+            key for key in live.keys() | stored.keys()
+            if live.get(key) != stored.get(key)
+        }
+        for user_id, ingredient_id in sorted(wrong)[:20]:
+            self.stdout.write(
+                f'Пользователь {user_id}, ингредиент {ingredient_id}: '
+                f'в списке {stored.get((user_id, ingredient_id))}, '
+                f'в корзине {live.get((user_id, ingredient_id))}'
+            )
+        if wrong:
+            raise CommandError(f'Расхождений в списках покупок: {len(wrong)}')
+        self.stdout.write(self.style.SUCCESS('Списки покупок совпадают'))
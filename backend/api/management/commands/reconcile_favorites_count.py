@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from api.services import favorites
+
+
+class Command(BaseCommand):
+    """Сверка Recipes.favorites_count с таблицей избранного."""
+
+    help = 'fix favorites_count values that drifted from Favorites'
+
+    def handle(self, *args, **options):
+        fixed = favorites.reconcile()
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счётчиков: {fixed}'
+        ))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.services import trending
+
+
+class Command(BaseCommand):
+    """Свёртка событий и пересчёт популярных за неделю рецептов.
+
+    Запускается по расписанию, например раз в 10 минут.
+    """
+
+    help = 'roll up favorite and cart events and refresh trending recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=trending.TRENDING_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rolled = trending.rollup()
+        count = trending.refresh(size=options['size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Свёрнуто событий: {rolled}, популярных рецептов: {count} '
+            f'за {time.monotonic() - started:.1f} с'
+        ))
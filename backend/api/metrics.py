@@ -0,0 +1,213 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# как часто процесс сбрасывает свои метрики в общий каталог
+FLUSH_INTERVAL = 1.0
+
+HISTOGRAMS = {
+    'http_request_duration_seconds': (
+        'Время обработки запроса',
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ),
+    'http_request_db_queries': (
+        'Число запросов к БД на один HTTP-запрос',
+        (0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+    ),
+    'http_response_size_bytes': (
+        'Размер тела ответа',
+        (256, 1024, 4096, 16384, 65536, 262144, 1048576),
+    ),
+}
+COUNTERS = {
+    'http_requests_total': 'Число запросов по маршруту и статусу',
+    'db_query_seconds_total': 'Суммарное время запросов к БД',
+    'cache_requests_total': 'Обращения к кэшу ответов: hit, miss',
+}
+
+
+def format_labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('"', r'\"'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+class Registry:
+    """Счётчики и гистограммы одного процесса.
+
+    При нескольких процессах gunicorn каждый из них раз в FLUSH_INTERVAL
+    секунд записывает свой снимок в отдельный файл каталога METRICS_DIR,
+    а эндпоинт метрик складывает снимки всех процессов. Файлы завершённых
+    процессов остаются, чтобы счётчики не уменьшались; каталог нужно
+    очищать при перезапуске сервиса, например держать его в tmpfs.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.filename = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.filename = os.path.join(
+                directory, f'metrics_{os.getpid()}_{uuid.uuid4().hex}.json'
+            )
+            atexit.register(self.flush)
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.flushed = 0.0
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+        self.maybe_flush()
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        buckets = HISTOGRAMS[name][1]
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [
+                    [0] * (len(buckets) + 1), 0.0
+                ]
+            # счётчики по корзинам не накопительные, сумма - при выводе
+            histogram[0][bisect_left(buckets, value)] += 1
+            histogram[1] += value
+        self.maybe_flush()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'counters': [
+                    [name, labels, value]
+                    for (name, labels), value in self.counters.items()
+                ],
+                'histograms': [
+                    [name, labels, list(counts), total]
+                    for (name, labels), (counts, total)
+                    in self.histograms.items()
+                ],
+            }
+
+    def maybe_flush(self):
+        if self.filename and time.monotonic() - self.flushed > FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        if not self.filename:
+            return
+        self.flushed = time.monotonic()
+        temporary = f'{self.filename}.tmp{threading.get_ident()}'
+        try:
+            with open(temporary, 'w') as file:
+                json.dump(self.snapshot(), file)
+            os.replace(temporary, self.filename)
+        except OSError:
+            # метрики не должны ломать обработку запроса
+            logger.exception('Не удалось записать метрики %s', self.filename)
+
+    def snapshots(self):
+        """Снимки всех процессов, для текущего - без задержки записи"""
+        yield self.snapshot()
+        if not self.directory:
+            return
+        for filename in glob.glob(
+            os.path.join(self.directory, 'metrics_*.json')
+        ):
+            if filename == self.filename:
+                continue
+            try:
+                with open(filename) as file:
+                    yield json.load(file)
+            except (OSError, ValueError):
+                # файл удалили или процесс ещё не дописал его
+                continue
+
+    def collect(self):
+        counters = {}
+        histograms = {}
+        for snapshot in self.snapshots():
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, counts, total in snapshot['histograms']:
+                key = (name, tuple(map(tuple, labels)))
+                merged = histograms.setdefault(key, [[0] * len(counts), 0.0])
+                for index, count in enumerate(counts):
+                    merged[0][index] += count
+                merged[1] += total
+        return counters, histograms
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus"""
+        counters, histograms = self.collect()
+        lines = []
+        for name, description in COUNTERS.items():
+            lines += [f'# HELP {name} {description}', f'# TYPE {name} counter']
+            for (key, labels), value in sorted(counters.items()):
+                if key == name:
+                    lines.append(
+                        f'{name}{format_labels(labels)} {round(value, 6)}'
+                    )
+        for name, (description, buckets) in HISTOGRAMS.items():
+            lines += [
+                f'# HELP {name} {description}', f'# TYPE {name} histogram'
+            ]
+            for (key, labels), (counts, total) in sorted(histograms.items()):
+                if key != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + ('+Inf',), counts):
+                    cumulative += count
+                    lines.append(
+                        f'{name}_bucket{format_labels(labels, le=bound)} '
+                        f'{cumulative}'
+                    )
+                lines.append(
+                    f'{name}_sum{format_labels(labels)} {round(total, 6)}'
+                )
+                lines.append(
+                    f'{name}_count{format_labels(labels)} {cumulative}'
+                )
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry(getattr(settings, 'METRICS_DIR', None))
+
+
+def observe_request(record):
+    """Учесть запрос по записи ProfilingMiddleware"""
+    labels = {'route': record['route'], 'method': record['method']}
+    registry.inc(
+        'http_requests_total', {**labels, 'status': record['status']}
+    )
+    registry.observe(
+        'http_request_duration_seconds', labels, record['total_ms'] / 1000
+    )
+    registry.observe('http_request_db_queries', labels, record['queries'])
+    registry.inc('db_query_seconds_total', labels, record['db_ms'] / 1000)
+    if record['size'] is not None:
+        registry.observe('http_response_size_bytes', labels, record['size'])
+
+
+def cache_lookup(cache_name, hit):
+    registry.inc(
+        'cache_requests_total',
+        {'cache': cache_name, 'result': 'hit' if hit else 'miss'}
+    )
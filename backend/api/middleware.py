@@ -0,0 +1,239 @@
+import asyncio
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from api import metrics
+
+logger = logging.getLogger(__name__)
+
+# сколько разных медленных адресов ждут профилирования одновременно
+WATCHED_LIMIT = 100
+
+
+class QueryTimer:
+    """Обёртка execute_wrapper: число запросов к БД и их общее время"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+# замеры текущего запроса; sync_to_async копирует контекст в поток,
+# где выполняется представление, так что запросы видны и под ASGI
+current_timings = ContextVar('current_timings', default=None)
+
+
+def observe(execute, sql, params, many, context):
+    """execute_wrapper: учесть запрос в замерах текущего запроса"""
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings.queries(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def observe_connection(sender, connection, **kwargs):
+    # в начало списка: connection.execute_wrapper() снимает последний
+    if observe not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, observe)
+
+
+def observe_queries():
+    """Подключить observe к уже открытым соединениям текущего потока"""
+    for connection in connections.all():
+        observe_connection(None, connection)
+
+
+class RequestTimings:
+    """Отметки времени одного запроса"""
+
+    def __init__(self):
+        self.queries = QueryTimer()
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.view_finished = None
+        self.render_finished = None
+
+    def mark_rendered(self, response):
+        self.render_finished = time.perf_counter()
+
+
+class ProfilingMiddleware:
+    """Время запроса по этапам: БД, представление, рендеринг.
+
+    Для каждого запроса считает число и время SQL-запросов, время
+    представления (вместе с сериализацией) и рендеринга ответа, отдаёт их
+    в заголовке Server-Timing, пишет строкой JSON в лог и передаёт
+    в реестр метрик.
+    Доля PROFILING_SAMPLE_RATE запросов выполняется под cProfile, дамп
+    сохраняется в PROFILING_DUMP_DIR, если каталог задан; в нём остаются
+    последние PROFILING_DUMP_LIMIT дампов. Если запрос дольше
+    PROFILING_SLOW_MS, следующий запрос по тому же адресу тоже
+    профилируется: сам медленный запрос уже не профилировать, а постоянно
+    держать cProfile включённым слишком дорого.
+    Тело потокового ответа отдаётся после middleware и в замер не входит.
+    Запросы к БД считаются и под ASGI, в каком бы потоке ни выполнялось
+    представление. cProfile работает только под WSGI: в цикле событий
+    он не увидел бы работы представления.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+        self.slow_ms = getattr(settings, 'PROFILING_SLOW_MS', 1000)
+        self.dump_dir = getattr(settings, 'PROFILING_DUMP_DIR', None)
+        self.dump_limit = getattr(settings, 'PROFILING_DUMP_LIMIT', 100)
+        self.server_timing = getattr(settings, 'PROFILING_SERVER_TIMING', True)
+        # запросы обслуживаются из нескольких потоков
+        self.lock = threading.Lock()
+        self.watched = set()
+        if asyncio.iscoroutinefunction(get_response):
+            # по этому признаку Django вызывает middleware как корутину
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        timings = request.timings = RequestTimings()
+        observe_queries()
+        token = current_timings.set(timings)
+        profiler = self.start_profiler(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            current_timings.reset(token)
+        return self.finish(request, response, timings, profiler)
+
+    async def __acall__(self, request):
+        timings = request.timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response, timings, None)
+
+    def finish(self, request, response, timings, profiler):
+        finished = time.perf_counter()
+        record = self.summary(request, response, timings, finished)
+        metrics.observe_request(record)
+        if profiler is not None:
+            record['profile'] = self.dump(request, profiler)
+        if record['total_ms'] >= self.slow_ms:
+            self.watch(request.path)
+            logger.warning(json.dumps(record, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(record, ensure_ascii=False))
+        if self.server_timing:
+            response['Server-Timing'] = self.header(record)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timings.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # ответы DRF рендерятся после всех process_template_response,
+        # а наш middleware вызывается последним
+        request.timings.view_finished = time.perf_counter()
+        response.add_post_render_callback(request.timings.mark_rendered)
+        return response
+
+    def start_profiler(self, request):
+        if not self.dump_dir:
+            return None
+        with self.lock:
+            watched = request.path in self.watched
+            self.watched.discard(request.path)
+        if not watched and random.random() >= self.sample_rate:
+            return None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def watch(self, path):
+        with self.lock:
+            if len(self.watched) < WATCHED_LIMIT:
+                self.watched.add(path)
+
+    def summary(self, request, response, timings, finished):
+        view_started = timings.view_started or timings.started
+        view_finished = timings.view_finished or finished
+        render_ms = 0.0
+        if timings.view_finished and timings.render_finished:
+            render_ms = (timings.render_finished - view_finished) * 1000
+        match = request.resolver_match
+        return {
+            'method': request.method,
+            'path': request.path,
+            # имя маршрута вместо адреса, чтобы число меток не росло
+            'route': match.view_name if match else 'unresolved',
+            'status': str(response.status_code),
+            'queries': timings.queries.count,
+            'db_ms': round(timings.queries.duration * 1000, 2),
+            'view_ms': round((view_finished - view_started) * 1000, 2),
+            'render_ms': round(render_ms, 2),
+            'total_ms': round((finished - timings.started) * 1000, 2),
+            'size': None if response.streaming else len(response.content),
+        }
+
+    def header(self, record):
+        return ', '.join((
+            f'db;dur={record["db_ms"]};desc="{record["queries"]} queries"',
+            f'view;dur={record["view_ms"]}',
+            f'render;dur={record["render_ms"]}',
+            f'total;dur={record["total_ms"]}',
+        ))
+
+    def dump(self, request, profiler):
+        os.makedirs(self.dump_dir, exist_ok=True)
+        slug = re.sub(r'[^\w]+', '_', request.path).strip('_') or 'root'
+        path = os.path.join(
+            self.dump_dir,
+            f'{time.time_ns()}_{request.method.lower()}_{slug}.prof'
+        )
+        profiler.dump_stats(path)
+        self.rotate()
+        return path
+
+    def rotate(self):
+        """Удалить самые старые дампы сверх dump_limit"""
+        with self.lock:
+            # имена начинаются со времени, сортировка по имени - по возрасту
+            dumps = sorted(
+                name for name in os.listdir(self.dump_dir)
+                if name.endswith('.prof')
+            )
+            for name in dumps[:max(len(dumps) - self.dump_limit, 0)]:
+                try:
+                    os.remove(os.path.join(self.dump_dir, name))
+                except FileNotFoundError:
+                    # дамп уже удалил другой процесс
+                    pass
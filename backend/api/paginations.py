@@ -1,6 +1,206 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def cursor_int(value):
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise ValueError(value)
+    return value
+
+
+def cursor_str(value):
+    if not isinstance(value, str):
+        raise ValueError(value)
+    return value
+
+
+def cursor_datetime(value):
+    moment = parse_datetime(cursor_str(value))
+    if moment is None:
+        raise ValueError(value)
+    return moment
+
+
+def get_recipes_limit(request):
+    """Параметр ?recipes_limit=, разобранный как ?limit= у пагинатора.
+
+    Некорректное значение игнорируется, тогда выводятся все рецепты.
+    """
+    try:
+        return _positive_int(
+            request.query_params['recipes_limit'], strict=True
+        )
+    except (KeyError, ValueError):
+        return None
 
 
 class LimitPageNumberPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = 'limit'
+
+
+class KeysetPagination(LimitPageNumberPagination):
+    """Постраничный вывод по курсору, включается параметром ?cursor=.
+
+    Вместо OFFSET и COUNT(*) следующая страница выбирается условием
+    "после последней записи" по полям ordering, поэтому дальние страницы
+    открываются так же быстро, как первая. Пустой cursor - первая
+    страница, ссылка на следующую приходит в поле next.
+    Без параметра cursor работает обычная постраничная навигация.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор'
+    ordering = ('-pk',)
+    # разбор значений курсора, по одному на поле ordering
+    cursor_types = (cursor_int,)
+
+    def use_keyset(self, request):
+        return self.cursor_query_param in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.use_keyset(request)
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.after(position))
+        results = list(queryset[:page_size + 1])
+        self.next_position = None
+        if len(results) > page_size:
+            results = results[:page_size]
+            self.next_position = [
+                getattr(results[-1], field.lstrip('-'))
+                for field in self.ordering
+            ]
+        return results
+
+    def after(self, position):
+        """Условие "строго после position" в порядке ordering"""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        # нестрогая граница по первому полю позволяет БД читать индекс
+        # с нужного места, а не перебирать условие OR по всем строкам
+        first = self.ordering[0]
+        lookup = 'lte' if first.startswith('-') else 'gte'
+        return Q(**{f'{first.lstrip("-")}__{lookup}': position[0]}) & condition
+
+    def decode_cursor(self, request):
+        cursor = request.query_params[self.cursor_query_param]
+        if not cursor:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if (
+                not isinstance(position, list)
+                or len(position) != len(self.ordering)
+            ):
+                raise ValueError(position)
+            return [
+                parse(value)
+                for parse, value in zip(self.cursor_types, position)
+            ]
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        return base64.urlsafe_b64encode(
+            # isoformat сохраняет микросекунды, которые DjangoJSONEncoder
+            # отбрасывает
+            json.dumps(position, default=lambda value: value.isoformat()).
+            encode()
+        ).decode()
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if self.next_position is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.next_position)
+        )
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+
+class RecipesPagination(KeysetPagination):
+    ordering = ('-pub_date', '-id')
+    cursor_types = (cursor_datetime, cursor_int)
+
+    def use_keyset(self, request):
+        # результаты поиска упорядочены по релевантности, а популярные
+        # рецепты - по счётчику, который меняется между страницами
+        return (
+            super().use_keyset(request)
+            and not request.query_params.get('search')
+            and not request.query_params.get('ordering')
+        )
+
+
+class SubscriptionsPagination(KeysetPagination):
+    ordering = ('username', 'id')
+    cursor_types = (cursor_str, cursor_int)
+
+
+class FeedPagination(KeysetPagination):
+    """Лента подписок: всегда по курсору, из нескольких источников.
+
+    paginate_queryset принимает список запросов со значениями pub_date
+    и recipe_id. Из каждого берётся не больше страницы после курсора,
+    результаты сливаются в общем порядке.
+    """
+    ordering = ('-pub_date', '-recipe_id')
+    cursor_types = (cursor_datetime, cursor_int)
+
+    def use_keyset(self, request):
+        return True
+
+    def paginate_queryset(self, querysets, request, view=None):
+        self.keyset = True
+        self.request = request
+        page_size = self.get_page_size(request)
+        position = None
+        if self.cursor_query_param in request.query_params:
+            position = self.decode_cursor(request)
+        rows = {}
+        for queryset in querysets:
+            queryset = queryset.order_by(*self.ordering)
+            if position is not None:
+                queryset = queryset.filter(self.after(position))
+            for row in queryset[:page_size + 1]:
+                rows[row['recipe_id']] = row
+        results = sorted(
+            rows.values(),
+            key=lambda row: (row['pub_date'], row['recipe_id']),
+            reverse=True
+        )
+        self.next_position = None
+        if len(results) > page_size:
+            results = results[:page_size]
+            self.next_position = [
+                results[-1]['pub_date'], results[-1]['recipe_id']
+            ]
+        return results
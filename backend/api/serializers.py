@@ -1,3 +1,7 @@
+from collections import Counter
+
+from django.core.files.storage import default_storage
+from django.db import transaction
 from rest_framework import serializers
 
 from drf_extra_fields.fields import Base64ImageField
@@ -8,6 +12,17 @@ from recipes.models import (
     RecipesIngredients
 )
 from users.models import User, Subscribtion
+from api import caching
+from api.fields import HashedBase64ImageField
+from api.paginations import get_recipes_limit
+from api.services import images as images_service
+from api.services import search, shopping_list
+from api.services.cookable_index import cookable_index
+
+# сколько рецептов можно передать в одном пакетном запросе
+BULK_LIMIT = 500
+# сколько продуктов можно передать в подбор рецептов
+COOKABLE_LIMIT = 100
 
 
 class CustomUserSerializer(UserSerializer):
@@ -29,6 +44,8 @@ class CustomUserSerializer(UserSerializer):
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         return Subscribtion.objects.filter(
             user=request.user, author=obj).exists()
 
@@ -86,6 +103,8 @@ class SubcribeListSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         return Subscribtion.objects.filter(
             user=request.user, author=obj
         ).exists()
@@ -95,15 +114,17 @@ class SubcribeListSerializer(serializers.ModelSerializer):
         if not request or request.user.is_anonymous:
             return False
         context = {'request': request}
-        recipes_limit = request.query_params.get('recipes_limit')
+        recipes_limit = get_recipes_limit(request)
         if recipes_limit is not None:
-            recipes = obj.recipes.all()[:int(recipes_limit)]
+            recipes = obj.recipes.all()[:recipes_limit]
         else:
             recipes = obj.recipes.all()
         return SubcribeRecipesSerializer(
             recipes, many=True, context=context).data
 
     def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
         return obj.recipes.count()
 
 
@@ -139,10 +160,12 @@ class RecIngReadSerializer(serializers.ModelSerializer):
 
 
 class RecIngSerializer(serializers.ModelSerializer):
-    """Создание записи в связанной таблице"""
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredients.objects.all()
-    )
+    """Создание записи в связанной таблице.
+
+    Ингредиенты по id ищет RecipesWriteSerializer одним запросом
+    на весь рецепт.
+    """
+    id = serializers.IntegerField()
     amount = serializers.IntegerField()
 
     class Meta:
@@ -161,6 +184,7 @@ class RecipesReadSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True)
     image = Base64ImageField()
     author = CustomUserSerializer(read_only=True)
+    images = serializers.SerializerMethodField()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
@@ -171,44 +195,76 @@ class RecipesReadSerializer(serializers.ModelSerializer):
             'author',
             'name',
             'image',
+            'images',
             'text',
             'ingredients',
             'tags',
             'cooking_time',
             'is_favorited',
             'is_in_shopping_cart',
+            'favorites_count',
         )
 
     def get_user(self):
         return self.context['request'].user
 
     def get_ingredients(self, obj):
-        ingredients = RecipesIngredients.objects.filter(recipes=obj)
+        # obj.recipe - строки RecipesIngredients, при чтении списка
+        # они уже загружены через prefetch
+        ingredients = obj.recipe.all()
+        if 'recipe' not in getattr(obj, '_prefetched_objects_cache', {}):
+            ingredients = ingredients.select_related('ingredients')
         return RecIngReadSerializer(ingredients, many=True).data
 
+    def get_images(self, obj):
+        """Ссылки на уменьшенные копии картинки в WebP и JPEG.
+
+        Пока копии не готовы, возвращает None: клиент показывает image.
+        """
+        if not obj.image or not obj.image_variants:
+            return None
+        request = self.context.get('request')
+        images = images_service.variant_names(obj.image.name)
+        for formats in images.values():
+            for extension, name in formats.items():
+                url = default_storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                formats[extension] = url
+        return images
+
     def get_is_favorited(self, obj):
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         return Favorites.objects.filter(user=request.user, recipe=obj).exists()
 
     def get_is_in_shopping_cart(self, obj):
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         return ShoppingCart.objects.filter(
             user=request.user, recipe=obj).exists()
 
 
+class CookableRecipeSerializer(RecipesReadSerializer):
+    """Рецепт в подборе по продуктам: сколько ингредиентов не хватает"""
+    missing = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipesReadSerializer.Meta):
+        fields = RecipesReadSerializer.Meta.fields + ('missing',)
+
+
 class RecipesWriteSerializer(serializers.ModelSerializer):
     """Создание рецепта"""
     ingredients = RecIngSerializer(many=True)
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True
-    )
+    tags = serializers.ListField(child=serializers.IntegerField())
     author = CustomUserSerializer(read_only=True)
-    image = Base64ImageField()
+    image = HashedBase64ImageField(upload_to='recipes/')
 
     class Meta:
         model = Recipes
@@ -232,20 +288,44 @@ class RecipesWriteSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 'Необходимо выбрать хотя бы один тег'
             )
-        return value
+        tags = Tag.objects.in_bulk(value)
+        errors = {}
+        seen = set()
+        for index, pk in enumerate(value):
+            if pk not in tags:
+                errors[index] = [f'Тег {pk} не найден']
+            elif pk in seen:
+                errors[index] = [f'Тег {pk} повторяется']
+            seen.add(pk)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return [tags[pk] for pk in value]
 
     def validate_ingredients(self, value):
+        """Все ингредиенты рецепта ищутся одним запросом"""
         if len(value) == 0:
             raise serializers.ValidationError(
                 'Необходимо выбрать хотя бы один ингредиент'
             )
-        for ingredient in value:
-            amount = ingredient['amount']
-            if int(amount) <= 0:
-                raise serializers.ValidationError(
-                    'Необходимо выбрать количество ингредиента'
-                )
-        return value
+        ingredients = Ingredients.objects.in_bulk(
+            [item['id'] for item in value]
+        )
+        errors = [{} for _ in value]
+        seen = set()
+        for item, error in zip(value, errors):
+            if item['id'] not in ingredients:
+                error['id'] = [f'Ингредиент {item["id"]} не найден']
+            elif item['id'] in seen:
+                error['id'] = [f'Ингредиент {item["id"]} повторяется']
+            if item['amount'] <= 0:
+                error['amount'] = ['Необходимо выбрать количество ингредиента']
+            seen.add(item['id'])
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return [
+            {'id': ingredients[item['id']], 'amount': item['amount']}
+            for item in value
+        ]
 
     def validate_cookingtime(self, value):
         for i in value:
@@ -275,28 +355,113 @@ class RecipesWriteSerializer(serializers.ModelSerializer):
     def create(self, validated_data):  # функция для создания рецепта
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
-        recipes = Recipes.objects.create(**validated_data)
-        self.create_tags(tags, recipes)
-        self.create_ingredients(ingredients, recipes)
+        with transaction.atomic():
+            recipes = Recipes.objects.create(**validated_data)
+            self.create_tags(tags, recipes)
+            self.create_ingredients(ingredients, recipes)
+            self.schedule_images(recipes)
         return recipes
 
+    def schedule_images(self, recipes):
+        name = recipes.image.name
+        transaction.on_commit(
+            lambda: images_service.schedule_variants(name)
+        )
+
     #  функция для обновления рецепта
     def update(self, instance, validated_data):
-        instance.image = validated_data.get('image', instance.image)
-        instance.name = validated_data.get('name', instance.name)
-        instance.text = validated_data.get('text', instance.text)
-        instance.cooking_time = validated_data.get(
-            'cooking_time', instance.cooking_time
-        )
-        instance.tags.clear()
-        tags = validated_data.get('tags')
-        self.create_tags(tags, instance)
-        RecipesIngredients.objects.filter(recipes=instance).all().delete()
-        ingredients = validated_data.get('ingredients')
-        self.create_ingredients(ingredients, instance)
-        instance.save()
+        """Записывает только отличия от текущего рецепта.
+
+        Без изменений ни сохранения, ни сброса кэша и поискового индекса
+        не происходит.
+        """
+        with transaction.atomic():
+            fields = [
+                field for field in ('name', 'text', 'cooking_time', 'image')
+                if field in validated_data
+                and getattr(instance, field) != validated_data[field]
+            ]
+            for field in fields:
+                setattr(instance, field, validated_data[field])
+            if 'image' in fields:
+                # копии новой картинки ещё не готовы
+                instance.image_variants = False
+            if fields:
+                instance.save(update_fields=fields + (
+                    ['image_variants'] if 'image' in fields else []
+                ))
+            if 'tags' in validated_data:
+                self.update_tags(instance, validated_data['tags'])
+            if 'ingredients' in validated_data:
+                self.update_ingredients(
+                    instance, validated_data['ingredients']
+                )
+            if 'image' in fields:
+                self.schedule_images(instance)
         return instance
 
+    def update_tags(self, recipes, tags):
+        current = set(recipes.tags.values_list('id', flat=True))
+        new = {tag.id for tag in tags}
+        added, removed = new - current, current - new
+        if removed:
+            recipes.tags.remove(*removed)
+        if added:
+            recipes.tags.add(*added)
+
+    def diff_ingredients(self, recipes, amounts):
+        """Строки для вставки, обновления, удаления и изменения количеств"""
+        rows = {}
+        deleted = []
+        for row in RecipesIngredients.objects.filter(recipes=recipes):
+            pk = row.ingredients_id
+            # повторы одного ингредиента в старых рецептах удаляются
+            if pk in amounts and pk not in rows:
+                rows[pk] = row
+            else:
+                deleted.append(row)
+        created = []
+        updated = []
+        deltas = Counter()
+        for row in deleted:
+            deltas[row.ingredients_id] -= row.amount
+        for pk, amount in amounts.items():
+            row = rows.get(pk)
+            if row is None:
+                created.append(RecipesIngredients(
+                    recipes=recipes, ingredients_id=pk, amount=amount
+                ))
+                deltas[pk] += amount
+            elif row.amount != amount:
+                deltas[pk] += amount - row.amount
+                row.amount = amount
+                updated.append(row)
+        return created, updated, deleted, deltas
+
+    def update_ingredients(self, recipes, ingredients):
+        created, updated, deleted, deltas = self.diff_ingredients(
+            recipes,
+            {item['id'].id: item['amount'] for item in ingredients}
+        )
+        if deleted:
+            RecipesIngredients.objects.filter(
+                id__in=[row.id for row in deleted]
+            ).delete()
+        if updated:
+            RecipesIngredients.objects.bulk_update(updated, ['amount'])
+        if created:
+            RecipesIngredients.objects.bulk_create(created)
+        if created or updated:
+            # bulk_create и bulk_update не отправляют сигналы
+            caching.recipes_changed(recipes.pk)
+        if created or deleted:
+            search.schedule([recipes.pk])
+            cookable_index.schedule([recipes.pk])
+        if any(deltas.values()):
+            shopping_list.apply_deltas(
+                shopping_list.cart_user_ids(recipes), deltas
+            )
+
     def to_representation(self, instance):
         request = self.context.get('request')
         context = {'request': request}
@@ -334,3 +499,34 @@ class ShoppingCartSerializer(serializers.ModelSerializer):  # корзина п
             'user',
             'recipe'
         )
+
+
+class RecipesBulkSerializer(serializers.Serializer):
+    """Список id рецептов для пакетного добавления и удаления"""
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BULK_LIMIT
+    )
+
+    def validate_recipes(self, value):
+        ids = list(dict.fromkeys(value))
+        recipes = Recipes.objects.filter(id__in=ids).only(
+            'id', 'name', 'image', 'cooking_time'
+        ).in_bulk()
+        missing = [pk for pk in ids if pk not in recipes]
+        if missing:
+            raise serializers.ValidationError(
+                f'Рецепты не найдены: {missing}'
+            )
+        return [recipes[pk] for pk in ids]
+
+
+class CookableQuerySerializer(serializers.Serializer):
+    """Параметры подбора: ?ingredients=1&ingredients=2&missing=1"""
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=COOKABLE_LIMIT
+    )
+    missing = serializers.IntegerField(min_value=0, default=0)
@@ -1,19 +1,89 @@
 from rest_framework import status
+from django.db import transaction
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from rest_framework.response import Response
 
-from recipes.models import Recipes
-from api.serializers import RecipesReadSerializer
+from recipes.models import Favorites, Recipes, ShoppingCart
+from users.models import User
+from api import caching
+from api.serializers import RecipesBulkSerializer, SubcribeRecipesSerializer
+from api.services import favorites, shopping_list, trending
 
 
 def post_or_del_method(method, user, pk, model):
     """Метод для добавления/удаления"""
 
     recipe = get_object_or_404(Recipes, pk=pk)
+    # строка корзины и сохранённый список покупок меняются вместе
     if method == 'POST':
-        model.objects.get_or_create(user=user, recipe=recipe)
-        serializer = RecipesReadSerializer(recipe)
+        with transaction.atomic():
+            _, created = model.objects.get_or_create(
+                user=user, recipe=recipe
+            )
+            if created and model is ShoppingCart:
+                shopping_list.add_recipe(user, recipe)
+            elif created and model is Favorites:
+                favorites.add([recipe.pk])
+            if created:
+                trending.record(model, [recipe.pk], user)
+        serializer = SubcribeRecipesSerializer(recipe)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    with transaction.atomic():
+        # счётчик и список покупок меняет только тот запрос, который
+        # действительно удалил строку: параллельный DELETE удалит 0 строк
+        deleted, _ = model.objects.filter(user=user, recipe=recipe).delete()
+        if not deleted:
+            raise Http404
+        if model is ShoppingCart:
+            shopping_list.remove_recipe(user, recipe)
+        elif model is Favorites:
+            favorites.remove([recipe.pk])
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+def bulk_post_or_del_method(request, model):
+    """Пакетное добавление/удаление: {"recipes": [id, ...]}
+
+    Рецепты, которые уже добавлены (или уже удалены), пропускаются.
+    Строка пользователя блокируется до конца транзакции: иначе два
+    параллельных запроса посчитали бы одни рецепты добавленными дважды
+    и дважды изменили список покупок и счётчики.
+    """
+    serializer = RecipesBulkSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    recipes = serializer.validated_data['recipes']
+    user = request.user
+    ids = [recipe.id for recipe in recipes]
+    with transaction.atomic():
+        User.objects.select_for_update().values('pk').get(pk=user.pk)
+        existing = set(model.objects.filter(
+            user=user, recipe_id__in=ids
+        ).values_list('recipe_id', flat=True))
+        if request.method == 'POST':
+            changed = [pk for pk in ids if pk not in existing]
+            model.objects.bulk_create(
+                [model(user=user, recipe_id=pk) for pk in changed],
+                ignore_conflicts=True
+            )
+        else:
+            changed = [pk for pk in ids if pk in existing]
+            model.objects.filter(user=user, recipe_id__in=changed).delete()
+        if model is ShoppingCart and request.method == 'POST':
+            shopping_list.add_recipes(user, changed)
+        elif model is ShoppingCart:
+            shopping_list.remove_recipes(user, changed)
+        elif request.method == 'POST':
+            favorites.add(changed)
+        else:
+            favorites.remove(changed)
+        if request.method == 'POST':
+            trending.record(model, changed, user)
+    # bulk_create не отправляет post_save, кэш пользователя сбрасываем сами
+    caching.user_changed(user.id)
+    if request.method == 'POST':
+        serializer = SubcribeRecipesSerializer(
+            recipes, many=True, context={'request': request}
+        )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
-    instance = get_object_or_404(model, user=user, recipe=recipe)
-    instance.delete()
     return Response(status=status.HTTP_204_NO_CONTENT)
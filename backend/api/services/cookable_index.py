@@ -0,0 +1,125 @@
+import heapq
+import threading
+import time
+from collections import Counter, defaultdict
+from functools import partial
+
+from django.db import transaction
+
+from recipes.models import RecipesIngredients
+
+MATCH_LIMIT = 1000
+# сколько лучших кандидатов проверяется фильтрами списка
+CANDIDATES_LIMIT = 10000
+# через сколько секунд индекс перечитывается из БД: изменения,
+# сделанные в других процессах, сигналы сюда не доставят
+REBUILD_INTERVAL = 300
+
+
+class CookableIndex:
+    """Индекс "рецепт - ингредиенты" в памяти процесса.
+
+    Для рецепта хранится отсортированный кортеж id ингредиентов, для
+    ингредиента - множество рецептов, в которые он входит. Подбор
+    рецептов по имеющимся продуктам проходит только по рецептам, где
+    есть хотя бы один из них, и в БД не ходит.
+    """
+
+    def __init__(self, limit=MATCH_LIMIT, rebuild_interval=REBUILD_INTERVAL):
+        self.limit = limit
+        self.rebuild_interval = rebuild_interval
+        self._lock = threading.RLock()
+        self._built_at = None
+        self._clear()
+
+    def _clear(self):
+        self._recipes = {}
+        self._postings = {}
+
+    def build(self):
+        """Полностью перечитать состав рецептов из БД"""
+        recipes = defaultdict(set)
+        for recipe_id, ingredient_id in RecipesIngredients.objects.values_list(
+            'recipes_id', 'ingredients_id'
+        ).order_by().iterator(chunk_size=10000):
+            recipes[recipe_id].add(ingredient_id)
+        with self._lock:
+            self._clear()
+            for pk, ingredients in recipes.items():
+                self._add(pk, ingredients)
+            self._built_at = time.monotonic()
+
+    def _ensure_built(self):
+        if (
+            self._built_at is None
+            or time.monotonic() - self._built_at > self.rebuild_interval
+        ):
+            self.build()
+
+    def _add(self, pk, ingredients):
+        self._recipes[pk] = tuple(sorted(ingredients))
+        for ingredient in ingredients:
+            self._postings.setdefault(ingredient, set()).add(pk)
+
+    def _remove(self, pk):
+        for ingredient in self._recipes.pop(pk, ()):
+            self._postings[ingredient].discard(pk)
+
+    def refresh(self, recipe_ids):
+        """Перечитать состав рецептов; удалённые рецепты уходят из индекса"""
+        if self._built_at is None:
+            return
+        recipes = defaultdict(set)
+        for recipe_id, ingredient_id in RecipesIngredients.objects.filter(
+            recipes_id__in=recipe_ids
+        ).values_list('recipes_id', 'ingredients_id'):
+            recipes[recipe_id].add(ingredient_id)
+        with self._lock:
+            for pk in recipe_ids:
+                self._remove(pk)
+                if recipes[pk]:
+                    self._add(pk, recipes[pk])
+
+    def schedule(self, recipe_ids):
+        """Обновить рецепты после фиксации текущей транзакции"""
+        transaction.on_commit(partial(self.refresh, list(recipe_ids)))
+
+    def match(self, ingredients, missing=0, allowed=None, limit=None):
+        """Рецепты, для которых не хватает не больше missing ингредиентов.
+
+        Возвращает пары (id рецепта, сколько не хватает) по убыванию
+        доли имеющихся ингредиентов. allowed - функция, которая из списка
+        id оставляет подходящие (например, по фильтрам списка); ей
+        передаются лучшие CANDIDATES_LIMIT кандидатов по порядку пачками
+        по limit, пока не наберётся limit рецептов.
+        """
+        limit = limit or self.limit
+        with self._lock:
+            self._ensure_built()
+            matched = Counter()
+            for ingredient in set(ingredients):
+                matched.update(self._postings.get(ingredient, ()))
+            found = []
+            for pk, count in matched.items():
+                total = len(self._recipes[pk])
+                if total - count <= missing:
+                    found.append((-count / total, -count, -pk, total - count))
+        if allowed is None:
+            return [
+                (-pk, lack)
+                for _, _, pk, lack in heapq.nsmallest(limit, found)
+            ]
+        found = heapq.nsmallest(CANDIDATES_LIMIT, found)
+        selected = []
+        for start in range(0, len(found), limit):
+            batch = [
+                (-pk, lack) for _, _, pk, lack in found[start:start + limit]
+            ]
+            ids = allowed([pk for pk, _ in batch])
+            selected += [(pk, lack) for pk, lack in batch if pk in ids]
+            if len(selected) >= limit:
+                break
+        return selected[:limit]
+
+
+cookable_index = CookableIndex()
@@ -0,0 +1,62 @@
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from api import caching
+from recipes.models import Recipes
+
+
+def change_count(recipe_ids, delta):
+    """Атомарно изменить favorites_count рецептов на delta.
+
+    Вызывающий код вычитает только строки, которые сам удалил, поэтому
+    параллельные удаления не вычитают дважды. Ограничение нулём -
+    лишь страховка для счётчика, уже разошедшегося с таблицей
+    Favorites; такие расхождения исправляет reconcile.
+    """
+    if not recipe_ids:
+        return
+    Recipes.objects.filter(id__in=recipe_ids).update(
+        favorites_count=Greatest(F('favorites_count') + delta, 0)
+    )
+    caching.counters_changed(recipe_ids)
+
+
+def add(recipe_ids):
+    change_count(recipe_ids, 1)
+
+
+def remove(recipe_ids):
+    change_count(recipe_ids, -1)
+
+
+def drop_user(user):
+    """Вычесть избранное удаляемого пользователя: оно удалится каскадом.
+
+    Строки блокируются до конца удаления: параллельный DELETE из
+    избранного дождётся его, ничего не удалит и ничего не вычтет.
+    """
+    recipe_ids = list(
+        user.favorites.select_for_update().values_list(
+            'recipe_id', flat=True
+        )
+    )
+    remove(recipe_ids)
+
+
+def reconcile(batch_size=1000):
+    """Исправить счётчики, разошедшиеся с таблицей Favorites"""
+    drifted = [
+        Recipes(id=pk, favorites_count=actual)
+        for pk, actual in Recipes.objects.annotate(
+            actual=Count('favorites')
+        ).exclude(
+            favorites_count=F('actual')
+        ).values_list('id', 'actual').order_by().iterator()
+    ]
+    Recipes.objects.bulk_update(
+        drifted, ['favorites_count'], batch_size=batch_size
+    )
+    if drifted:
+        caching.recipes_changed()
+        caching.counters_changed([recipe.id for recipe in drifted])
+    return len(drifted)
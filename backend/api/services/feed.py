@@ -0,0 +1,156 @@
+"""Лента рецептов авторов, на которых подписан пользователь.
+
+Новый рецепт раскладывается по лентам подписчиков в фоновом потоке
+(fan-out on write), поэтому чтение ленты - один проход по индексу
+FeedEntry. Рецепты плодовитых авторов, у которых больше
+FEED_PULL_RECIPES рецептов, не раскладываются: при подписке пришлось
+бы копировать их все. Такие рецепты читаются из Recipes при показе
+ленты (pull on read) и сливаются с записями ленты.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count, F
+
+from recipes.models import FeedEntry, Recipes
+from users.models import Subscribtion
+
+logger = logging.getLogger(__name__)
+
+PULL_RECIPES = getattr(settings, 'FEED_PULL_RECIPES', 500)
+PULL_AUTHORS_KEY = 'feed:pull_authors'
+PULL_AUTHORS_TIMEOUT = 60 * 5
+BATCH_SIZE = 1000
+
+executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='feed')
+
+
+def pull_authors():
+    """id авторов, чьи рецепты читаются при показе ленты"""
+    authors = cache.get(PULL_AUTHORS_KEY)
+    if authors is None:
+        authors = set(
+            Recipes.objects.values('author_id').
+            order_by().
+            annotate(total=Count('id')).
+            filter(total__gt=PULL_RECIPES).
+            values_list('author_id', flat=True)
+        )
+        cache.set(PULL_AUTHORS_KEY, authors, PULL_AUTHORS_TIMEOUT)
+    return authors
+
+
+def fan_out(recipe_id):
+    """Разложить рецепт по лентам подписчиков автора"""
+    recipe = Recipes.objects.filter(id=recipe_id).values(
+        'author_id', 'pub_date'
+    ).first()
+    if recipe is None or recipe['author_id'] in pull_authors():
+        return 0
+    followers = Subscribtion.objects.filter(
+        author_id=recipe['author_id']
+    ).values_list('user_id', flat=True)
+    entries = [
+        FeedEntry(user_id=user_id, recipe_id=recipe_id, **recipe)
+        for user_id in followers.iterator()
+    ]
+    FeedEntry.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+    return len(entries)
+
+
+def process(recipe_id):
+    try:
+        fan_out(recipe_id)
+    except DatabaseError:
+        logger.exception('Не удалось разложить рецепт %s по лентам', recipe_id)
+    finally:
+        # соединение потока executor-а само не закроется
+        connection.close()
+
+
+def schedule(recipe_id):
+    """Разложить рецепт в фоне после фиксации транзакции"""
+    transaction.on_commit(partial(executor.submit, process, recipe_id))
+
+
+def backfill(user_id, author_id):
+    """Добавить в ленту рецепты автора после подписки"""
+    if author_id in pull_authors():
+        return
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(
+                user_id=user_id, recipe_id=recipe_id,
+                author_id=author_id, pub_date=pub_date
+            )
+            for recipe_id, pub_date in Recipes.objects.filter(
+                author_id=author_id
+            ).values_list('id', 'pub_date')
+        ],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def prune(user_id, author_id):
+    """Убрать из ленты рецепты автора после отписки"""
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild(users=None):
+    """Пересобрать ленты пользователей, по умолчанию - всех"""
+    entries = FeedEntry.objects.all()
+    subscriptions = Subscribtion.objects.exclude(
+        author_id__in=pull_authors()
+    )
+    if users is not None:
+        entries = entries.filter(user__in=users)
+        subscriptions = subscriptions.filter(user__in=users)
+    rows = subscriptions.filter(author__recipes__isnull=False).values_list(
+        'user_id', 'author_id', 'author__recipes__id',
+        'author__recipes__pub_date'
+    ).order_by()
+    created = 0
+    with transaction.atomic():
+        entries.delete()
+        batch = []
+        for user_id, author_id, recipe_id, pub_date in rows.iterator():
+            batch.append(FeedEntry(
+                user_id=user_id, author_id=author_id,
+                recipe_id=recipe_id, pub_date=pub_date
+            ))
+            if len(batch) == BATCH_SIZE:
+                created += len(FeedEntry.objects.bulk_create(batch))
+                batch = []
+        created += len(FeedEntry.objects.bulk_create(batch))
+    return created
+
+
+def sources(user):
+    """Запросы, из которых складывается лента: записи и pull-авторы.
+
+    Каждый отдаёт pub_date и recipe_id, порядок и курсор задаёт
+    FeedPagination. Рецепты каждого pull-автора читаются отдельным
+    запросом по индексу (author, pub_date): общий запрос с IN по авторам
+    сортировал бы все их рецепты.
+    """
+    querysets = [
+        FeedEntry.objects.filter(user=user).values('pub_date', 'recipe_id')
+    ]
+    authors = pull_authors()
+    if authors:
+        querysets += [
+            Recipes.objects.filter(author_id=author_id).
+            annotate(recipe_id=F('id')).
+            values('pub_date', 'recipe_id')
+            for author_id in Subscribtion.objects.filter(
+                user=user, author_id__in=authors
+            ).values_list('author_id', flat=True)
+        ]
+    return querysets
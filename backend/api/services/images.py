@@ -0,0 +1,113 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from PIL import Image
+
+from api import caching
+from recipes.models import Recipes
+
+logger = logging.getLogger(__name__)
+
+# наибольшая сторона картинки для каждого варианта
+VARIANTS = {
+    'thumb': 160,
+    'card': 480,
+    'full': 1280,
+}
+FORMATS = {
+    'webp': 'WEBP',
+    'jpeg': 'JPEG',
+}
+QUALITY = 82
+
+executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='images')
+# картинки, которые уже ждут обработки в этом процессе
+pending = set()
+pending_lock = threading.Lock()
+
+
+def variant_name(name, variant, extension):
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return f'{directory}/variants/{stem}_{variant}.{extension}'
+
+
+def variant_names(name):
+    """Имена файлов всех вариантов картинки: {вариант: {формат: имя}}"""
+    return {
+        variant: {
+            extension: variant_name(name, variant, extension)
+            for extension in FORMATS
+        }
+        for variant in VARIANTS
+    }
+
+
+def make_variants(name):
+    """Сохранить уменьшенные копии картинки в WebP и JPEG"""
+    if all(
+        default_storage.exists(target)
+        for formats in variant_names(name).values()
+        for target in formats.values()
+    ):
+        return
+    with default_storage.open(name, 'rb') as file:
+        original = Image.open(file)
+        original.load()
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA')
+    for variant, size in VARIANTS.items():
+        image = original.copy()
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        for extension, image_format in FORMATS.items():
+            target = variant_name(name, variant, extension)
+            if default_storage.exists(target):
+                continue
+            if image_format == 'JPEG' and image.mode == 'RGBA':
+                # у JPEG нет прозрачности, фон делаем белым
+                background = Image.new('RGB', image.size, 'white')
+                background.paste(image, mask=image.getchannel('A'))
+                result = background
+            else:
+                result = image
+            buffer = BytesIO()
+            result.save(buffer, image_format, quality=QUALITY)
+            default_storage.save(target, ContentFile(buffer.getvalue()))
+
+
+def mark_ready(name):
+    """Отметить рецепты с этой картинкой: копии можно отдавать"""
+    recipes = Recipes.objects.filter(image=name, image_variants=False)
+    ids = list(recipes.values_list('id', flat=True))
+    recipes.update(image_variants=True)
+    for recipe_id in ids:
+        caching.recipes_changed(recipe_id)
+    return len(ids)
+
+
+def process(name):
+    try:
+        make_variants(name)
+        mark_ready(name)
+    except (OSError, ValueError) as error:
+        logger.error('Не удалось подготовить картинку %s: %s', name, error)
+    finally:
+        with pending_lock:
+            pending.discard(name)
+        # соединение потока executor-а само не закроется
+        connection.close()
+
+
+def schedule_variants(name):
+    """Подготовить варианты в фоновом потоке, не задерживая запрос"""
+    with pending_lock:
+        if name in pending:
+            return
+        pending.add(name)
+    executor.submit(process, name)
@@ -0,0 +1,179 @@
+import threading
+import time
+
+from recipes.models import Ingredients
+
+SEARCH_LIMIT = 50
+# через сколько секунд индекс перечитывается из БД: изменения,
+# сделанные в других процессах, сигналы сюда не доставят
+REBUILD_INTERVAL = 300
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class IngredientIndex:
+    """Индекс ингредиентов в памяти процесса для автодополнения.
+
+    Префиксное дерево отдаёт ингредиенты, название которых начинается
+    с запроса, триграммы - ингредиенты, в названии которых запрос
+    из трёх и более символов встречается в середине. В БД поиск не ходит.
+    """
+
+    def __init__(self, limit=SEARCH_LIMIT, rebuild_interval=REBUILD_INTERVAL):
+        self.limit = limit
+        self.rebuild_interval = rebuild_interval
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()
+        self._built_at = None
+        self._clear()
+
+    def _clear(self):
+        self._items = {}
+        self._names = {}
+        self._trie = {}
+        self._postings = {}
+
+    def build(self):
+        """Полностью перечитать ингредиенты из БД.
+
+        Новый индекс собирается отдельно и подменяет старый целиком,
+        поиск во время перестроения идёт по старому.
+        """
+        fresh = IngredientIndex(self.limit, self.rebuild_interval)
+        for pk, name, measurement_unit in Ingredients.objects.values_list(
+            'id', 'name', 'measurement_unit'
+        ).order_by().iterator():
+            fresh._add(pk, name, measurement_unit)
+        with self._lock:
+            self._items = fresh._items
+            self._names = fresh._names
+            self._trie = fresh._trie
+            self._postings = fresh._postings
+            self._built_at = time.monotonic()
+
+    def _ensure_built(self):
+        if (
+            self._built_at is not None
+            and time.monotonic() - self._built_at <= self.rebuild_interval
+        ):
+            return
+        # пока один поток перестраивает индекс, остальные ищут по старому;
+        # ждать приходится только самому первому построению
+        if self._build_lock.acquire(blocking=self._built_at is None):
+            try:
+                if (
+                    self._built_at is None
+                    or time.monotonic() - self._built_at
+                    > self.rebuild_interval
+                ):
+                    self.build()
+            finally:
+                self._build_lock.release()
+
+    def _add(self, pk, name, measurement_unit):
+        key = name.lower()
+        self._items[pk] = {
+            'id': pk,
+            'name': name,
+            'measurement_unit': measurement_unit,
+        }
+        self._names[pk] = key
+        node = self._trie
+        for char in key:
+            node = node.setdefault(char, {})
+        node.setdefault(None, set()).add(pk)
+        for gram in trigrams(key):
+            self._postings.setdefault(gram, set()).add(pk)
+
+    def _remove(self, pk):
+        key = self._names.pop(pk, None)
+        if key is None:
+            return
+        del self._items[pk]
+        path = [self._trie]
+        for char in key:
+            path.append(path[-1][char])
+        path[-1][None].discard(pk)
+        if not path[-1][None]:
+            del path[-1][None]
+        # пустые узлы удаляются снизу вверх
+        for depth in range(len(key), 0, -1):
+            if path[depth]:
+                break
+            del path[depth - 1][key[depth - 1]]
+        for gram in trigrams(key):
+            self._postings[gram].discard(pk)
+            if not self._postings[gram]:
+                del self._postings[gram]
+
+    def add(self, ingredient):
+        """Добавить или обновить ингредиент в уже построенном индексе"""
+        with self._lock:
+            if self._built_at is None:
+                return
+            self._remove(ingredient.pk)
+            self._add(
+                ingredient.pk, ingredient.name, ingredient.measurement_unit
+            )
+
+    def remove(self, ingredient):
+        with self._lock:
+            self._remove(ingredient.pk)
+
+    def _prefix_matches(self, query, limit):
+        node = self._trie
+        for char in query:
+            node = node.get(char)
+            if node is None:
+                return []
+        found = []
+        stack = [node]
+        # обход в глубину в алфавитном порядке
+        while stack and len(found) < limit:
+            node = stack.pop()
+            found.extend(sorted(node.get(None, ())))
+            stack.extend(
+                node[char] for char in sorted(
+                    (char for char in node if char is not None),
+                    reverse=True
+                )
+            )
+        return found[:limit]
+
+    def _substring_matches(self, query):
+        # короткий запрос без триграмм пришлось бы искать перебором всех
+        # названий, для него хватает совпадений по началу
+        if len(query) < 3:
+            return []
+        postings = sorted(
+            (self._postings.get(gram, set()) for gram in trigrams(query)),
+            key=len
+        )
+        candidates = set.intersection(*postings)
+        return sorted(
+            (pk for pk in candidates if query in self._names[pk]),
+            key=lambda pk: (self._names[pk], pk)
+        )
+
+    def search(self, query, limit=None):
+        """Ингредиенты, содержащие query: сначала совпадения по началу.
+
+        Запрос короче трёх символов ищется только по началу названия.
+        """
+        limit = limit or self.limit
+        query = query.lower()
+        self._ensure_built()
+        with self._lock:
+            found = self._prefix_matches(query, limit)
+            if len(found) < limit:
+                seen = set(found)
+                found.extend(
+                    pk for pk in self._substring_matches(query)
+                    if pk not in seen
+                )
+            return [self._items[pk] for pk in found[:limit]]
+
+
+ingredient_index = IngredientIndex()
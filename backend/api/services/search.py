@@ -0,0 +1,209 @@
+"""Полнотекстовый поиск рецептов с ранжированием BM25.
+
+Обратный индекс хранится в таблицах SearchDocument и SearchTerm, поэтому
+работает на любой БД. Слова приводятся к основе русским стеммером,
+вес слова зависит от поля: название важнее ингредиентов, ингредиенты
+важнее описания.
+"""
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count
+
+from api import caching
+from api.services.stemmer import stem
+from recipes.models import (
+    Recipes, RecipesIngredients, SearchDocument, SearchTerm
+)
+
+WORD = re.compile(r'\w+')
+STOP_WORDS = {
+    'и', 'в', 'во', 'на', 'с', 'со', 'к', 'ко', 'по', 'из', 'для', 'а',
+    'но', 'или', 'не', 'от', 'до', 'у', 'о', 'об', 'за', 'при',
+}
+WEIGHTS = {
+    'name': 3,
+    'ingredients': 2,
+    'text': 1,
+}
+K1 = 1.2
+B = 0.75
+SEARCH_LIMIT = 1000
+# строк индекса на одну основу запроса и основ в запросе
+POSTINGS_LIMIT = 2000
+QUERY_TERMS = 10
+TERM_LENGTH = 64
+STATS_KEY = 'search:stats'
+STATS_TIMEOUT = 60 * 5
+
+
+def terms(text):
+    """Основы слов текста без служебных слов"""
+    return [
+        stem(word)[:TERM_LENGTH]
+        for word in WORD.findall(text.lower())
+        if word not in STOP_WORDS
+    ]
+
+
+def document_terms(name, text, ingredients):
+    """Взвешенные частоты основ в рецепте"""
+    frequencies = Counter()
+    for field, value in (
+        ('name', name), ('text', text), ('ingredients', ' '.join(ingredients))
+    ):
+        for term in terms(value):
+            frequencies[term] += WEIGHTS[field]
+    return frequencies
+
+
+def reindex(recipe_ids, batch_size=1000):
+    """Пересобрать строки индекса для рецептов"""
+    recipe_ids = list(recipe_ids)
+    ingredients = defaultdict(list)
+    for recipe_id, name in RecipesIngredients.objects.filter(
+        recipes_id__in=recipe_ids
+    ).values_list('recipes_id', 'ingredients__name'):
+        ingredients[recipe_id].append(name)
+    documents = []
+    rows = []
+    for recipe_id, name, text in Recipes.objects.filter(
+        id__in=recipe_ids
+    ).values_list('id', 'name', 'text'):
+        frequencies = document_terms(name, text, ingredients[recipe_id])
+        documents.append(SearchDocument(
+            recipe_id=recipe_id, length=sum(frequencies.values())
+        ))
+        rows += [
+            SearchTerm(document_id=recipe_id, term=term, frequency=frequency)
+            for term, frequency in frequencies.items()
+        ]
+    with transaction.atomic():
+        SearchDocument.objects.filter(recipe_id__in=recipe_ids).delete()
+        SearchDocument.objects.bulk_create(documents, batch_size=batch_size)
+        SearchTerm.objects.bulk_create(rows, batch_size=batch_size)
+    # сигнал сохранения сбросил кэш списков до фиксации, а строки индекса
+    # появились только сейчас: без новой версии поиск по спискам
+    # закэшировался бы по старому индексу
+    caching.recipes_changed()
+    for recipe_id in recipe_ids:
+        caching.bump_version(caching.RECIPE_VERSION.format(recipe_id))
+
+
+def schedule(recipe_ids):
+    """Переиндексировать рецепты после фиксации текущей транзакции"""
+    transaction.on_commit(partial(reindex, list(recipe_ids)))
+
+
+def reindex_ingredient(ingredient_id, batch_size=500):
+    """Переиндексировать рецепты с ингредиентом пачками по id.
+
+    Популярный ингредиент входит в тысячи рецептов, поэтому id рецептов
+    не читаются все сразу, а каждая пачка пишется своей транзакцией.
+    """
+    last_id = 0
+    while True:
+        recipe_ids = list(RecipesIngredients.objects.filter(
+            ingredients_id=ingredient_id, recipes_id__gt=last_id
+        ).order_by('recipes_id').values_list(
+            'recipes_id', flat=True
+        ).distinct()[:batch_size])
+        if not recipe_ids:
+            return
+        reindex(recipe_ids)
+        last_id = recipe_ids[-1]
+
+
+def schedule_ingredient(ingredient_id):
+    """Переиндексировать рецепты с ингредиентом после фиксации"""
+    transaction.on_commit(partial(reindex_ingredient, ingredient_id))
+
+
+def rebuild(recipe_ids=None, batch_size=500):
+    """Пересобрать индекс для рецептов, по умолчанию - для всех"""
+    if recipe_ids is None:
+        recipe_ids = Recipes.objects.order_by('id').values_list(
+            'id', flat=True
+        )
+    recipe_ids = list(recipe_ids)
+    for start in range(0, len(recipe_ids), batch_size):
+        reindex(recipe_ids[start:start + batch_size])
+    cache.delete(STATS_KEY)
+    return len(recipe_ids)
+
+
+def get_stats():
+    """Число документов и средняя длина, пересчитываются раз в 5 минут"""
+    stats = cache.get(STATS_KEY)
+    if stats is None:
+        stats = SearchDocument.objects.aggregate(
+            count=Count('pk'), length=Avg('length')
+        )
+        cache.set(STATS_KEY, stats, STATS_TIMEOUT)
+    return stats
+
+
+def score(idf, frequency, length, average):
+    """Вклад основы в оценку BM25 документа"""
+    norm = K1 * (1 - B + B * length / average)
+    return idf * frequency * (K1 + 1) / (frequency + norm)
+
+
+def search(query, queryset=None, limit=SEARCH_LIMIT):
+    """id рецептов из queryset по убыванию релевантности запросу.
+
+    Для каждой основы читаются только POSTINGS_LIMIT строк с наибольшей
+    частотой (по индексу search_term_impact), а не все документы со
+    словом. Лучшие limit кандидатов затем досчитываются по всем основам
+    запроса; документ, который ни для одной основы не попал в первые
+    POSTINGS_LIMIT, в результат не попадёт.
+    """
+    words = list(dict.fromkeys(terms(query)))[:QUERY_TERMS]
+    stats = get_stats()
+    if not words or not stats['count']:
+        return []
+    count = stats['count']
+    idf = {
+        term: math.log(1 + (count - total + 0.5) / (total + 0.5))
+        for term, total in SearchTerm.objects.filter(term__in=words).
+        values('term').
+        order_by().
+        annotate(total=Count('id')).
+        values_list('term', 'total')
+    }
+    if not idf:
+        return []
+    postings = SearchTerm.objects.all()
+    if queryset is not None and queryset.query.has_filters():
+        postings = postings.filter(document_id__in=queryset.values('id'))
+    scores = Counter()
+    counted = set()
+    for term, weight in idf.items():
+        for document_id, frequency, length in postings.filter(
+            term=term
+        ).order_by('-frequency').values_list(
+            'document_id', 'frequency', 'document__length'
+        )[:POSTINGS_LIMIT]:
+            scores[document_id] += score(
+                weight, frequency, length, stats['length']
+            )
+            counted.add((document_id, term))
+    candidates = dict(heapq.nlargest(
+        limit, scores.items(), key=lambda item: (item[1], item[0])
+    ))
+    # основы, по которым кандидат не попал в первые строки
+    for document_id, term, frequency, length in postings.filter(
+        term__in=idf, document_id__in=candidates
+    ).values_list('document_id', 'term', 'frequency', 'document__length'):
+        if (document_id, term) not in counted:
+            candidates[document_id] += score(
+                idf[term], frequency, length, stats['length']
+            )
+    return sorted(
+        candidates, key=lambda pk: (candidates[pk], pk), reverse=True
+    )
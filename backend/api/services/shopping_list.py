@@ -0,0 +1,150 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+
+from recipes.models import RecipesIngredients, ShoppingCart, ShoppingList
+
+
+def recipe_amounts(recipe):
+    """Количество каждого ингредиента в рецепте"""
+    return recipes_amounts([recipe.pk])
+
+
+def recipes_amounts(recipe_ids):
+    """Суммарное количество каждого ингредиента в нескольких рецептах"""
+    return Counter(dict(
+        RecipesIngredients.objects.filter(recipes_id__in=recipe_ids).
+        values('ingredients_id').
+        order_by('ingredients_id').
+        annotate(total=Sum('amount')).
+        values_list('ingredients_id', 'total')
+    ))
+
+
+def apply_deltas(user_ids, deltas):
+    """Изменить списки покупок пользователей на deltas
+
+    deltas - словарь {id ингредиента: на сколько изменить количество}.
+    """
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    user_ids = [pk for pk in user_ids if pk is not None]
+    if not deltas or not user_ids:
+        return
+    with transaction.atomic():
+        ShoppingList.objects.bulk_create(
+            [
+                ShoppingList(user_id=user_id, ingredient_id=pk, amount=0)
+                for user_id in user_ids
+                for pk, delta in deltas.items() if delta > 0
+            ],
+            ignore_conflicts=True
+        )
+        items = ShoppingList.objects.filter(
+            user_id__in=user_ids, ingredient_id__in=deltas
+        )
+        items.update(amount=F('amount') + Case(
+            *(When(ingredient_id=pk, then=Value(delta))
+              for pk, delta in deltas.items()),
+            default=Value(0),
+            output_field=IntegerField()
+        ))
+        items.filter(amount__lte=0).delete()
+
+
+def add_recipe(user, recipe):
+    add_recipes(user, [recipe.pk])
+
+
+def remove_recipe(user, recipe):
+    remove_recipes(user, [recipe.pk])
+
+
+def add_recipes(user, recipe_ids):
+    if recipe_ids:
+        apply_deltas([user.id], recipes_amounts(recipe_ids))
+
+
+def remove_recipes(user, recipe_ids):
+    if recipe_ids:
+        amounts = recipes_amounts(recipe_ids)
+        apply_deltas(
+            [user.id], {pk: -amount for pk, amount in amounts.items()}
+        )
+
+
+def cart_user_ids(recipe):
+    return list(ShoppingCart.objects.filter(
+        recipe=recipe
+    ).values_list('user_id', flat=True))
+
+
+def change_recipe(recipe, old_amounts):
+    """Учесть новый состав рецепта у всех, у кого он в корзине"""
+    deltas = recipe_amounts(recipe)
+    deltas.subtract(old_amounts)
+    apply_deltas(cart_user_ids(recipe), deltas)
+
+
+def drop_recipe(recipe):
+    """Убрать рецепт из списков покупок перед его удалением"""
+    amounts = recipe_amounts(recipe)
+    apply_deltas(
+        cart_user_ids(recipe),
+        {pk: -amount for pk, amount in amounts.items()}
+    )
+
+
+def live_totals(users=None):
+    """Список покупок, посчитанный заново по корзинам"""
+    # одно условие на корзину: второй filter() по той же связи
+    # добавил бы ещё один JOIN и размножил строки
+    if users is None:
+        carts = RecipesIngredients.objects.filter(
+            recipes__shopping_cart__user__isnull=False
+        )
+    else:
+        carts = RecipesIngredients.objects.filter(
+            recipes__shopping_cart__user__in=users
+        )
+    return {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in (
+            carts.values('recipes__shopping_cart__user', 'ingredients').
+            order_by().
+            annotate(total=Sum('amount')).
+            values_list('recipes__shopping_cart__user', 'ingredients', 'total')
+        )
+    }
+
+
+def stored_totals(users=None):
+    items = ShoppingList.objects.all()
+    if users is not None:
+        items = items.filter(user__in=users)
+    return {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in items.values_list(
+            'user_id', 'ingredient_id', 'amount'
+        )
+    }
+
+
+def rebuild(users=None, batch_size=1000):
+    """Пересобрать списки покупок целиком"""
+    totals = live_totals(users)
+    with transaction.atomic():
+        items = ShoppingList.objects.all()
+        if users is not None:
+            items = items.filter(user__in=users)
+        items.delete()
+        ShoppingList.objects.bulk_create(
+            [
+                ShoppingList(
+                    user_id=user_id, ingredient_id=ingredient_id, amount=amount
+                )
+                for (user_id, ingredient_id), amount in totals.items()
+            ],
+            batch_size=batch_size
+        )
+    return len(totals)
@@ -0,0 +1,131 @@
+"""Стеммер Snowball для русского языка.
+
+Отрезает окончания и суффиксы, чтобы "супы", "супа" и "суп" давали
+одну основу. Окончания ищутся только в области RV - после первой
+гласной, словообразовательные суффиксы - в области R2.
+"""
+
+VOWELS = set('аеиоуыэюя')
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ('ся', 'сь')
+VERB = (
+    (
+        'ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но',
+        'ет', 'ют', 'ны', 'ть', 'ешь', 'нно',
+    ),
+    (
+        'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей',
+        'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят',
+        'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю',
+    ),
+)
+NOUN = (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+    'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+    'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+    'ья', 'я',
+)
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+
+def longest_first(endings):
+    return tuple(sorted(endings, key=len, reverse=True))
+
+
+ADJECTIVE = longest_first(ADJECTIVE)
+NOUN = longest_first(NOUN)
+REFLEXIVE = longest_first(REFLEXIVE)
+PERFECTIVE_GERUND = tuple(longest_first(group) for group in PERFECTIVE_GERUND)
+PARTICIPLE = tuple(longest_first(group) for group in PARTICIPLE)
+VERB = tuple(longest_first(group) for group in VERB)
+
+
+def region(word, start=0):
+    """Начало области после первой пары гласная - согласная"""
+    for index in range(start + 1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            return index + 1
+    return len(word)
+
+
+def cut(word, endings, minimum):
+    """Отрезать самое длинное окончание, целиком лежащее в области"""
+    for ending in endings:
+        if word.endswith(ending) and len(word) - len(ending) >= minimum:
+            return word[:-len(ending)]
+    return None
+
+
+def cut_grouped(word, groups, minimum):
+    """Окончания первой группы отрезаются только после "а" или "я"."""
+    first, second = groups
+    candidates = []
+    for ending in first:
+        start = len(word) - len(ending)
+        if (
+            word.endswith(ending) and start - 1 >= minimum
+            and word[start - 1] in 'ая'
+        ):
+            candidates.append(ending)
+    for ending in second:
+        if word.endswith(ending) and len(word) - len(ending) >= minimum:
+            candidates.append(ending)
+    if not candidates:
+        return None
+    return word[:-len(max(candidates, key=len))]
+
+
+def cut_adjectival(word, minimum):
+    stem = cut(word, ADJECTIVE, minimum)
+    if stem is None:
+        return None
+    return cut_grouped(stem, PARTICIPLE, minimum) or stem
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    rv = next(
+        (index + 1 for index, char in enumerate(word) if char in VOWELS),
+        len(word)
+    )
+    if rv >= len(word):
+        return word
+    r2 = region(word, region(word))
+    result = cut_grouped(word, PERFECTIVE_GERUND, rv)
+    if result is None:
+        word = cut(word, REFLEXIVE, rv) or word
+        result = (
+            cut_adjectival(word, rv)
+            or cut_grouped(word, VERB, rv)
+            or cut(word, NOUN, rv)
+            or word
+        )
+    word = result
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+    word = cut(word, DERIVATIONAL, r2) or word
+    if word.endswith('нн') and len(word) - 1 >= rv:
+        return word[:-1]
+    superlative = cut(word, SUPERLATIVE, rv)
+    if superlative is not None:
+        word = superlative
+        if word.endswith('нн'):
+            word = word[:-1]
+        return word
+    if word.endswith('ь') and len(word) - 1 >= rv:
+        word = word[:-1]
+    return word
@@ -0,0 +1,182 @@
+"""Рецепты, популярные за последнюю неделю.
+
+Добавления в избранное и корзину пишутся в RecipeEvent: вставка без
+обновления общих строк не создаёт конкуренции за блокировки. Команда
+refresh_trending сворачивает события завершённых часов в часовые и
+дневные корзины RecipeActivity и пересчитывает небольшую таблицу
+TrendingRecipe. Вклад добавления убывает вдвое каждые HALF_LIFE.
+Свёрнутые события хранятся WINDOW: пока строка есть, повторное
+добавление того же рецепта тем же пользователем не учитывается,
+так что удаление и добавление по кругу оценку не накручивают.
+"""
+import heapq
+from collections import Counter, defaultdict
+from datetime import timedelta
+from operator import itemgetter
+
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from recipes.models import (
+    Favorites, RecipeActivity, RecipeEvent, ShoppingCart, TrendingRecipe
+)
+
+KINDS = {
+    Favorites: RecipeEvent.FAVORITE,
+    ShoppingCart: RecipeEvent.CART,
+}
+# добавление в избранное говорит об интересе к рецепту больше,
+# чем добавление в корзину
+WEIGHTS = {
+    RecipeEvent.FAVORITE: 1.0,
+    RecipeEvent.CART: 0.5,
+}
+PERIODS = {
+    RecipeActivity.HOUR: timedelta(hours=1),
+    RecipeActivity.DAY: timedelta(days=1),
+}
+HALF_LIFE = timedelta(days=2)
+WINDOW = timedelta(days=7)
+# часовые корзины нужны только за последние сутки, дневные - за окно
+HOURLY_RETENTION = timedelta(days=3)
+DAILY_RETENTION = timedelta(days=30)
+TRENDING_SIZE = 500
+BATCH_SIZE = 1000
+
+
+def record(model, recipe_ids, user):
+    """Отметить добавление рецептов в избранное или корзину"""
+    kind = KINDS[model]
+    # повтор за WINDOW упирается в unique_recipe_event и пропускается
+    RecipeEvent.objects.bulk_create(
+        [
+            RecipeEvent(recipe_id=recipe_id, user=user, kind=kind)
+            for recipe_id in recipe_ids
+        ],
+        ignore_conflicts=True
+    )
+
+
+def truncate(moment, period):
+    moment = moment.replace(minute=0, second=0, microsecond=0)
+    if period == RecipeActivity.DAY:
+        moment = moment.replace(hour=0)
+    return moment
+
+
+def merge(period, totals):
+    """Прибавить {(начало, рецепт): Counter(kind: число)} к корзинам"""
+    # корзины затронутых периодов читаются целиком: список рецептов
+    # в IN был бы почти таким же длинным
+    existing = {
+        (row.start, row.recipe_id): row
+        for row in RecipeActivity.objects.filter(
+            period=period, start__in={start for start, _ in totals}
+        )
+    }
+    created = []
+    updated = []
+    for (start, recipe_id), counts in totals.items():
+        row = existing.get((start, recipe_id))
+        if row is None:
+            row = RecipeActivity(
+                period=period, start=start, recipe_id=recipe_id
+            )
+            created.append(row)
+        else:
+            updated.append(row)
+        row.favorites += counts[RecipeEvent.FAVORITE]
+        row.carts += counts[RecipeEvent.CART]
+    RecipeActivity.objects.bulk_create(created, batch_size=BATCH_SIZE)
+    RecipeActivity.objects.bulk_update(
+        updated, ['favorites', 'carts'], batch_size=BATCH_SIZE
+    )
+
+
+def rollup(now=None):
+    """Свернуть события завершённых часов в корзины.
+
+    Возвращает число свёрнутых событий. Команду не нужно запускать
+    параллельно: два процесса учли бы одни события дважды.
+    """
+    now = now or timezone.now()
+    events = RecipeEvent.objects.filter(
+        rolled=False, created__lt=truncate(now, RecipeActivity.HOUR)
+    )
+    # события, вставленные во время свёртки, дождутся следующего запуска
+    last = events.aggregate(last=Max('id'))['last']
+    rolled = 0
+    with transaction.atomic():
+        if last is not None:
+            events = events.filter(id__lte=last)
+            rows = events.annotate(hour=TruncHour('created')).values(
+                'hour', 'recipe_id', 'kind'
+            ).order_by().annotate(total=Count('id')).values_list(
+                'hour', 'recipe_id', 'kind', 'total'
+            )
+            hourly = defaultdict(Counter)
+            daily = defaultdict(Counter)
+            for hour, recipe_id, kind, total in rows:
+                hourly[hour, recipe_id][kind] += total
+                daily[
+                    truncate(hour, RecipeActivity.DAY), recipe_id
+                ][kind] += total
+            merge(RecipeActivity.HOUR, hourly)
+            merge(RecipeActivity.DAY, daily)
+            rolled = events.update(rolled=True)
+        RecipeEvent.objects.filter(created__lt=now - WINDOW).delete()
+        RecipeActivity.objects.filter(
+            Q(period=RecipeActivity.HOUR, start__lt=now - HOURLY_RETENTION)
+            | Q(period=RecipeActivity.DAY, start__lt=now - DAILY_RETENTION)
+        ).delete()
+    return rolled
+
+
+def decay(age):
+    return 0.5 ** (max(age, timedelta()) / HALF_LIFE)
+
+
+def scores(now=None):
+    """Оценка каждого рецепта с добавлениями за последние WINDOW"""
+    now = now or timezone.now()
+    # последние сутки считаются по часам, более ранние дни - по дням
+    boundary = truncate(now - timedelta(days=1), RecipeActivity.DAY)
+    buckets = RecipeActivity.objects.filter(
+        Q(period=RecipeActivity.HOUR, start__gte=boundary)
+        | Q(
+            period=RecipeActivity.DAY,
+            start__lt=boundary, start__gte=now - WINDOW
+        )
+    ).values_list('recipe_id', 'period', 'start', 'favorites', 'carts')
+    result = Counter()
+    for recipe_id, period, start, favorites, carts in buckets.iterator():
+        result[recipe_id] += decay(now - start - PERIODS[period] / 2) * (
+            favorites * WEIGHTS[RecipeEvent.FAVORITE]
+            + carts * WEIGHTS[RecipeEvent.CART]
+        )
+    # события, которые ещё не свёрнуты
+    events = RecipeEvent.objects.filter(
+        rolled=False, created__gte=now - WINDOW
+    ).values_list('recipe_id', 'kind', 'created')
+    for recipe_id, kind, created in events.iterator():
+        result[recipe_id] += decay(now - created) * WEIGHTS[kind]
+    return result
+
+
+def refresh(now=None, size=TRENDING_SIZE):
+    """Пересчитать TrendingRecipe, вернуть число рецептов в списке"""
+    top = heapq.nlargest(
+        size, scores(now).items(), key=itemgetter(1)
+    )
+    with transaction.atomic():
+        TrendingRecipe.objects.all().delete()
+        TrendingRecipe.objects.bulk_create(
+            [
+                TrendingRecipe(recipe_id=recipe_id, score=score)
+                for recipe_id, score in top
+            ],
+            batch_size=BATCH_SIZE
+        )
+    return len(top)
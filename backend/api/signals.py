@@ -0,0 +1,162 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete
+)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api import authentication, caching
+from api.services import favorites, feed, search, shopping_list
+from api.services.cookable_index import cookable_index
+from api.services.ingredient_index import ingredient_index
+from recipes.models import (
+    Favorites, Ingredients, Recipes, RecipesIngredients, ShoppingCart, Tag
+)
+from users.models import Subscribtion
+
+User = get_user_model()
+# поля пользователя, которые попадают в ответы с рецептами
+USER_FIELDS = {'username', 'first_name', 'last_name', 'email'}
+
+
+@receiver(post_save, sender=Ingredients)
+def index_ingredient(sender, instance, **kwargs):
+    # после отката транзакции индекс не должен видеть изменение
+    transaction.on_commit(partial(ingredient_index.add, instance))
+
+
+@receiver(post_delete, sender=Ingredients)
+def unindex_ingredient(sender, instance, **kwargs):
+    # к фиксации delete() уже обнулит pk экземпляра
+    transaction.on_commit(
+        partial(ingredient_index.remove, Ingredients(pk=instance.pk))
+    )
+
+
+@receiver(pre_delete, sender=Recipes)
+def drop_from_shopping_lists(sender, instance, **kwargs):
+    # корзины удалятся каскадно, их ингредиенты нужно вычесть заранее
+    shopping_list.drop_recipe(instance)
+
+
+@receiver(pre_delete, sender=User)
+def drop_user_favorites(sender, instance, **kwargs):
+    # избранное удалится каскадно, счётчики рецептов нужно уменьшить
+    favorites.drop_user(instance)
+
+
+@receiver(post_save, sender=Recipes)
+@receiver(post_delete, sender=Recipes)
+def recipe_changed(sender, instance, **kwargs):
+    caching.recipes_changed(instance.pk)
+
+
+@receiver(post_save, sender=Recipes)
+def index_recipe(sender, instance, **kwargs):
+    # индекс строится после фиксации, когда ингредиенты уже сохранены;
+    # строки удалённого рецепта удаляются каскадом
+    search.schedule([instance.pk])
+
+
+@receiver(post_save, sender=Ingredients)
+def reindex_ingredient_recipes(sender, instance, created, **kwargs):
+    if not created:
+        search.schedule_ingredient(instance.pk)
+
+
+@receiver(post_save, sender=Recipes)
+def fan_out_recipe(sender, instance, created, **kwargs):
+    if created:
+        feed.schedule(instance.pk)
+
+
+@receiver(post_save, sender=Subscribtion)
+def backfill_feed(sender, instance, created, **kwargs):
+    if created:
+        feed.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscribtion)
+def prune_feed(sender, instance, **kwargs):
+    feed.prune(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=RecipesIngredients)
+@receiver(post_delete, sender=RecipesIngredients)
+def recipe_ingredients_changed(sender, instance, **kwargs):
+    caching.recipes_changed(instance.recipes_id)
+
+
+@receiver(post_save, sender=Recipes)
+@receiver(post_delete, sender=Recipes)
+@receiver(post_save, sender=RecipesIngredients)
+@receiver(post_delete, sender=RecipesIngredients)
+def index_recipe_ingredients(sender, instance, **kwargs):
+    # новый рецепт получает ингредиенты пакетом в той же транзакции,
+    # поэтому состав читается после фиксации
+    if sender is Recipes:
+        cookable_index.schedule([instance.pk])
+    else:
+        cookable_index.schedule([instance.recipes_id])
+
+
+@receiver(m2m_changed, sender=Recipes.tags.through)
+def recipe_tags_changed(sender, instance, action, **kwargs):
+    if action.startswith('post_') and isinstance(instance, Recipes):
+        caching.recipes_changed(instance.pk)
+    elif action.startswith('post_'):
+        caching.shared_changed()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, **kwargs):
+    caching.bump_version(caching.TAGS_VERSION)
+    caching.shared_changed()
+
+
+@receiver(post_save, sender=Ingredients)
+@receiver(post_delete, sender=Ingredients)
+def ingredient_changed(sender, **kwargs):
+    caching.bump_version(caching.INGREDIENTS_VERSION)
+    caching.shared_changed()
+
+
+@receiver(post_save, sender=Favorites)
+@receiver(post_delete, sender=Favorites)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_save, sender=Subscribtion)
+@receiver(post_delete, sender=Subscribtion)
+def user_lists_changed(sender, instance, **kwargs):
+    caching.user_changed(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, update_fields=None, **kwargs):
+    # сохранение last_login при входе на рецепты не влияет
+    if update_fields is None or USER_FIELDS & set(update_fields):
+        caching.shared_changed()
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    # выход через djoser, удаление токена или пользователя
+    authentication.invalidate(instance.key)
+
+
+@receiver(post_save, sender=User)
+def forget_user_tokens(sender, instance, update_fields=None, **kwargs):
+    # деактивация или другие изменения пользователя; вход только
+    # обновляет last_login, кэш от этого не устаревает. В общем кэше
+    # строки пользователя нет, сбрасывается только LRU процесса
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    for key in Token.objects.filter(user=instance).values_list(
+        'key', flat=True
+    ):
+        authentication.forget(key)
@@ -0,0 +1,131 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import local_tokens
+from api.services import shopping_list
+from api.services.ingredient_index import ingredient_index
+from recipes.models import (
+    Favorites, Ingredients, Recipes, RecipesIngredients, ShoppingCart, Tag,
+    CHOICES_COLOR, CHOICES_NAME, CHOICES_SLUG
+)
+from users.models import Subscribtion, User
+
+
+USERS = 40
+RECIPES_PER_USER = 8
+INGREDIENTS = 300
+INGREDIENTS_PER_RECIPE = 8
+# картинка 1x1 в base64
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1Pe'
+    'AAAADElEQVR4nGP4z8AAAAMBAQDJ/pLvAAAAAElFTkSuQmCC'
+)
+
+
+def seed_recipes(authors, tags, ingredients, prefix, count):
+    """Создаёт count рецептов на каждого автора с ингредиентами и тегами"""
+    Recipes.objects.bulk_create([
+        Recipes(
+            author=author,
+            name=f'{prefix} {author.username} {number}',
+            image='recipes/test.png',
+            text='Описание рецепта',
+            cooking_time=10 + number,
+        )
+        for author in authors
+        for number in range(count)
+    ])
+    recipes = list(Recipes.objects.filter(name__startswith=prefix))
+    RecipesIngredients.objects.bulk_create([
+        RecipesIngredients(
+            recipes=recipe,
+            ingredients=ingredients[
+                (recipe.id * INGREDIENTS_PER_RECIPE + number)
+                % len(ingredients)
+            ],
+            amount=number + 1,
+        )
+        for recipe in recipes
+        for number in range(INGREDIENTS_PER_RECIPE)
+    ])
+    Recipes.tags.through.objects.bulk_create([
+        Recipes.tags.through(recipes=recipe, tag=tags[recipe.id % len(tags)])
+        for recipe in recipes
+    ])
+    return recipes
+
+
+class SeededTestCase(TestCase):
+    """Пользователи, рецепты, избранное, корзина и подписки для тестов
+    с заметным объёмом данных"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create([
+            User(
+                username=f'user{number}',
+                email=f'user{number}@foodgram.ru',
+                first_name='Имя',
+                last_name='Фамилия',
+            )
+            for number in range(USERS)
+        ])
+        cls.users = list(User.objects.order_by('id'))
+        cls.user = cls.users[0]
+        cls.token = Token.objects.create(user=cls.user)
+        cls.tags = [
+            Tag.objects.create(name=name, color=color, slug=slug)
+            for (name, _), (color, _), (slug, _) in zip(
+                CHOICES_NAME, CHOICES_COLOR, CHOICES_SLUG
+            )
+        ]
+        Ingredients.objects.bulk_create([
+            Ingredients(name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(INGREDIENTS)
+        ])
+        cls.ingredients = list(Ingredients.objects.all())
+        cls.recipes = seed_recipes(
+            cls.users, cls.tags, cls.ingredients, 'Рецепт', RECIPES_PER_USER
+        )
+        Favorites.objects.bulk_create([
+            Favorites(user=cls.user, recipe=recipe)
+            for recipe in cls.recipes[::3]
+        ])
+        ShoppingCart.objects.bulk_create([
+            ShoppingCart(user=cls.user, recipe=recipe)
+            for recipe in cls.recipes[::4]
+        ])
+        Subscribtion.objects.bulk_create([
+            Subscribtion(user=cls.user, author=author)
+            for author in cls.users[1:]
+        ])
+        shopping_list.rebuild()
+
+    def setUp(self):
+        cache.clear()
+        local_tokens.clear()
+        ingredient_index.build()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.anonymous = APIClient()
+        # токен проверяется по БД только в первом запросе
+        self.client.get('/api/users/me/')
+
+    def assertQueries(self, budget, url, client=None):
+        client = client or self.client
+        with self.assertNumQueries(budget):
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200, url)
+        return response
+
+    def assertFlat(self, budget, url, client=None):
+        """Бюджет одинаков для маленькой и большой страницы"""
+        for limit in (1, 6, 50):
+            separator = '&' if '?' in url else '?'
+            self.assertQueries(
+                budget, f'{url}{separator}limit={limit}', client
+            )
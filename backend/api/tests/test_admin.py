@@ -0,0 +1,78 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.tests.base import INGREDIENTS_PER_RECIPE, seed_recipes
+from recipes.models import (
+    Favorites, Ingredients, Tag, CHOICES_COLOR, CHOICES_NAME, CHOICES_SLUG
+)
+from users.models import User
+
+
+class AdminTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(
+            username='admin', email='admin@ya.ru',
+            is_staff=True, is_superuser=True
+        )
+        cls.tag = Tag.objects.create(
+            name=CHOICES_NAME[0][0], color=CHOICES_COLOR[0][0],
+            slug=CHOICES_SLUG[0][0]
+        )
+        Ingredients.objects.bulk_create([
+            Ingredients(name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(INGREDIENTS_PER_RECIPE)
+        ])
+        cls.ingredients = list(Ingredients.objects.all())
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_recipes(self, prefix, count):
+        users = [
+            User.objects.create(
+                username=f'{prefix}{number}', email=f'{prefix}{number}@ya.ru'
+            )
+            for number in range(count)
+        ]
+        recipes = seed_recipes(users, [self.tag], self.ingredients, prefix, 1)
+        Favorites.objects.bulk_create([
+            Favorites(user=user, recipe=recipe)
+            for user in users
+            for recipe in recipes
+        ])
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        urls = (
+            '/admin/recipes/recipes/',
+            '/admin/recipes/favorites/',
+            '/admin/recipes/recipesingredients/',
+            '/admin/users/user/',
+        )
+        self.add_recipes('a', 2)
+        before = [self.changelist_queries(url) for url in urls]
+        self.add_recipes('b', 6)
+        self.assertEqual(
+            [self.changelist_queries(url) for url in urls], before
+        )
+
+    def test_autocomplete(self):
+        self.add_recipes('a', 2)
+        response = self.client.get(
+            '/admin/autocomplete/',
+            {
+                'term': 'a1', 'app_label': 'recipes',
+                'model_name': 'favorites', 'field_name': 'user'
+            }
+        )
+        self.assertEqual(
+            [user['text'] for user in response.json()['results']], ['a1']
+        )
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import (
+    AsyncRequestFactory, TransactionTestCase, override_settings
+)
+from rest_framework.authtoken.models import Token
+
+from api.async_views import ASGIHandler
+from api.middleware import ProfilingMiddleware
+from api.services import shopping_list
+from api.tests.base import seed_recipes
+from recipes.models import (
+    Ingredients, ShoppingCart, Tag, CHOICES_COLOR, CHOICES_NAME, CHOICES_SLUG
+)
+from recipes.views import RecipesViewSet, TagViewSet
+from users.models import User
+
+
+class AsyncViewsTests(TransactionTestCase):
+    """Данные должны быть зафиксированы: потоки пула видят их
+    через собственные соединения с БД"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='author', email='a@ya.ru')
+        self.token = Token.objects.create(user=self.user)
+        tag = Tag.objects.create(
+            name=CHOICES_NAME[0][0], color=CHOICES_COLOR[0][0],
+            slug=CHOICES_SLUG[0][0]
+        )
+        ingredient = Ingredients.objects.create(
+            name='Соль', measurement_unit='г'
+        )
+        self.recipe, = seed_recipes(
+            [self.user], [tag], [ingredient], 'Рецепт', 1
+        )
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipe)
+        shopping_list.rebuild([self.user.id])
+        self.factory = AsyncRequestFactory()
+
+    def get(self, view, path):
+        # AsyncRequestFactory в Django 3.2 передаёт extra как заголовки
+        request = self.factory.get(
+            path, authorization=f'Token {self.token.key}'
+        )
+        return async_to_sync(view)(request)
+
+    def test_views_stay_sync_without_setting(self):
+        view = TagViewSet.as_view({'get': 'list'})
+        self.assertFalse(asyncio.iscoroutinefunction(view))
+
+    @override_settings(ASYNC_VIEWS=True)
+    def test_reads_run_in_pool(self):
+        threads = []
+        view = RecipesViewSet.as_view({'get': 'list'})
+        self.assertTrue(asyncio.iscoroutinefunction(view))
+        original = RecipesViewSet.list
+
+        def list_recipes(*args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return original(*args, **kwargs)
+
+        with mock.patch.object(RecipesViewSet, 'list', list_recipes):
+            response = self.get(ProfilingMiddleware(view), '/api/recipes/')
+        self.assertTrue(threads[0].startswith('views'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_rendered)
+        self.assertEqual(
+            response.data['results'][0]['name'], self.recipe.name
+        )
+        # запросы из потока пула попадают в замер middleware
+        self.assertNotIn('desc="0 queries"', response['Server-Timing'])
+
+    def asgi_get(self, path):
+        messages = []
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': path,
+            'query_string': b'', 'headers': [
+                (b'host', b'testserver'),
+                (b'authorization', f'Token {self.token.key}'.encode()),
+            ],
+        }
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        async_to_sync(ASGIHandler())(scope, receive, send)
+        start, *body = messages
+        return dict(start['headers']), b''.join(
+            message.get('body', b'') for message in body
+        )
+
+    def test_streaming_response_is_read_outside_loop(self):
+        # ORM в цикле событий запрещён, генератор читается в потоке
+        _, body = self.asgi_get('/api/recipes/download_shopping_cart/')
+        self.assertEqual(body.decode(), 'Соль - 36 г\n')
+
+    def test_sync_view_queries_are_counted(self):
+        headers, _ = self.asgi_get('/api/users/')
+        self.assertNotIn(b'desc="0 queries"', headers[b'Server-Timing'])
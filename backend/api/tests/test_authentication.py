@@ -0,0 +1,69 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import cache_key, local_tokens
+from users.models import User
+
+
+class CachedTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        local_tokens.clear()
+        self.user = User.objects.create(username='user', email='user@ya.ru')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_is_checked_once(self):
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+        # остаётся только проверка подписки на самого себя
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/users/me/')
+        self.assertEqual(response.data['username'], 'user')
+        # LocMemCache не общий для процессов, токен ищется заново
+        local_tokens.clear()
+        with self.assertNumQueries(2):
+            self.client.get('/api/users/me/')
+
+    @override_settings(AUTH_TOKEN_SHARED_CACHE=True)
+    def test_shared_cache_keeps_only_ids(self):
+        self.client.get('/api/users/me/')
+        self.assertEqual(
+            cache.get(cache_key(self.token.key)),
+            (self.user.id, self.token.key)
+        )
+        local_tokens.clear()
+        # пользователь читается по первичному ключу
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/users/me/')
+        self.assertEqual(response.data['username'], 'user')
+
+    @override_settings(AUTH_TOKEN_SHARED_CACHE=True)
+    def test_update_deactivation_is_seen(self):
+        self.client.get('/api/users/me/')
+        # QuerySet.update не отправляет сигналов; запись LRU истекает
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        local_tokens.clear()
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+    def test_logout_invalidates_token(self):
+        self.client.get('/api/users/me/')
+        response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+    def test_deactivation_invalidates_token(self):
+        self.client.get('/api/users/me/')
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+    def test_profile_changes_are_visible(self):
+        self.client.get('/api/users/me/')
+        self.user.first_name = 'Новое имя'
+        self.user.save()
+        response = self.client.get('/api/users/me/')
+        self.assertEqual(response.data['first_name'], 'Новое имя')
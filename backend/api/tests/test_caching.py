@@ -0,0 +1,118 @@
+from django.core.cache import cache, caches
+from django.test import TestCase
+
+from api import caching
+from recipes.models import Ingredients, Recipes, Tag
+from users.models import User
+
+
+class AnonymousCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create(username='author', email='a@ya.ru')
+        cls.recipe = Recipes.objects.create(
+            author=author, name='Рецепт', text='Описание',
+            image='recipes/test.png', cooking_time=5
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def names(self):
+        return [
+            recipe['name']
+            for recipe in self.client.get('/api/recipes/').data['results']
+        ]
+
+    def test_write_invalidates_cached_responses(self):
+        detail = f'/api/recipes/{self.recipe.id}/'
+        self.assertEqual(self.names(), ['Рецепт'])
+        self.client.get(detail)
+        # оба ответа уже в кэше
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names(), ['Рецепт'])
+            self.client.get(detail)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.name = 'Новое название'
+            self.recipe.save()
+        self.assertEqual(self.names(), ['Новое название'])
+        self.assertEqual(
+            self.client.get(detail).data['name'], 'Новое название'
+        )
+
+    def test_versions_are_shared_between_processes(self):
+        self.names()
+        # другой процесс gunicorn со своим подключением к тому же кэшу
+        other = caches.create_connection('default')
+        other.incr(caching.LIST_VERSION)
+        Recipes.objects.filter(pk=self.recipe.pk).update(name='Другое')
+        self.assertEqual(self.names(), ['Другое'])
+
+
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tag = Tag.objects.create(
+            name='Завтрак', color='#E26C2D', slug='breakfast'
+        )
+        cls.ingredient = Ingredients.objects.create(
+            name='Соль', measurement_unit='г'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def assertWriteChangesETag(self, url, write):
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            write()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        return response
+
+    def test_tags(self):
+        response = self.assertWriteChangesETag(
+            '/api/tags/',
+            lambda: Tag.objects.create(
+                name='Обед', color='#49B64E', slug='lunch'
+            )
+        )
+        self.assertEqual(len(response.data), 2)
+
+        def rename():
+            self.tag.color = '#8775D2'
+            self.tag.save()
+        response = self.assertWriteChangesETag(
+            f'/api/tags/{self.tag.id}/', rename
+        )
+        self.assertEqual(response.data['color'], '#8775D2')
+
+    def test_ingredients(self):
+        response = self.assertWriteChangesETag(
+            '/api/ingredients/',
+            lambda: Ingredients.objects.create(
+                name='Сахар', measurement_unit='г'
+            )
+        )
+        self.assertEqual(len(response.data), 2)
+
+        def rename():
+            self.ingredient.measurement_unit = 'кг'
+            self.ingredient.save()
+        response = self.assertWriteChangesETag(
+            f'/api/ingredients/{self.ingredient.id}/', rename
+        )
+        self.assertEqual(response.data['measurement_unit'], 'кг')
+
+    def test_expired_version_changes_etag(self):
+        etag = self.client.get('/api/tags/')['ETag']
+        # так выглядит истечение CACHE_VERSION_TIMEOUT
+        cache.delete(caching.TAGS_VERSION)
+        response = self.client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
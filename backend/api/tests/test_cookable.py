@@ -0,0 +1,115 @@
+from django.test import TestCase
+
+from api.services.cookable_index import cookable_index
+from recipes.models import (
+    Ingredients, Recipes, RecipesIngredients, Tag, CHOICES_COLOR, CHOICES_NAME,
+    CHOICES_SLUG
+)
+from users.models import User
+
+
+class CookableTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(
+            username='author', email='author@ya.ru'
+        )
+        cls.other = User.objects.create(username='other', email='other@ya.ru')
+        cls.tag = Tag.objects.create(
+            name=CHOICES_NAME[0][0], color=CHOICES_COLOR[0][0],
+            slug=CHOICES_SLUG[0][0]
+        )
+        cls.ingredients = [
+            Ingredients.objects.create(
+                name=f'Продукт {number}', measurement_unit='г'
+            )
+            for number in range(4)
+        ]
+        cls.recipes = {}
+        for author, name, numbers in (
+            (cls.author, 'Яичница', (0, 1)),
+            (cls.author, 'Омлет', (0, 1, 2)),
+            (cls.author, 'Салат', (2, 3)),
+            (cls.other, 'Варёное яйцо', (0,)),
+        ):
+            recipe = cls.recipes[name] = Recipes.objects.create(
+                author=author, name=name, text='Описание',
+                image='recipes/test.png', cooking_time=5
+            )
+            for number in numbers:
+                RecipesIngredients.objects.create(
+                    recipes=recipe, ingredients=cls.ingredients[number],
+                    amount=1
+                )
+        cls.recipes['Варёное яйцо'].tags.add(cls.tag)
+
+    def setUp(self):
+        cookable_index.build()
+
+    def cookable(self, params):
+        have = '&'.join(
+            f'ingredients={self.ingredients[number].id}'
+            for number in (0, 1)
+        )
+        response = self.client.get(f'/api/recipes/cookable/?{have}{params}')
+        self.assertEqual(response.status_code, 200, response.data)
+        return [
+            (recipe['name'], recipe['missing'])
+            for recipe in response.data['results']
+        ]
+
+    def test_ranked_by_coverage(self):
+        self.assertEqual(
+            self.cookable(''), [('Яичница', 0), ('Варёное яйцо', 0)]
+        )
+        self.assertEqual(
+            self.cookable('&missing=1'),
+            [('Яичница', 0), ('Варёное яйцо', 0), ('Омлет', 1)]
+        )
+
+    def test_filters_are_applied(self):
+        self.assertEqual(
+            self.cookable(f'&missing=1&author={self.author.id}'),
+            [('Яичница', 0), ('Омлет', 1)]
+        )
+        self.assertEqual(
+            self.cookable(f'&tags={self.tag.slug}'), [('Варёное яйцо', 0)]
+        )
+
+    def test_invalid_params(self):
+        for url in ('/api/recipes/cookable/',
+                    '/api/recipes/cookable/?ingredients=x',
+                    '/api/recipes/cookable/?ingredients=1&missing=-1'):
+            self.assertEqual(self.client.get(url).status_code, 400, url)
+
+    def test_index_follows_changes(self):
+        salad = self.recipes['Салат']
+        with self.captureOnCommitCallbacks(execute=True):
+            RecipesIngredients.objects.filter(recipes=salad).delete()
+            RecipesIngredients.objects.create(
+                recipes=salad, ingredients=self.ingredients[1], amount=1
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipes['Яичница'].delete()
+        self.assertEqual(
+            self.cookable(''), [('Варёное яйцо', 0), ('Салат', 0)]
+        )
+
+    def test_filters_see_only_candidates(self):
+        # фильтры проверяются пачками по limit, начиная с лучших
+        checked = []
+
+        def allowed(ids):
+            checked.append(ids)
+            return {self.recipes['Омлет'].id}
+
+        have = [self.ingredients[0].id, self.ingredients[1].id]
+        self.assertEqual(
+            cookable_index.match(have, 1, allowed, limit=1),
+            [(self.recipes['Омлет'].id, 1)]
+        )
+        self.assertEqual(checked, [
+            [self.recipes['Яичница'].id], [self.recipes['Варёное яйцо'].id],
+            [self.recipes['Омлет'].id]
+        ])
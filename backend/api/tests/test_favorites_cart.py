@@ -0,0 +1,74 @@
+from rest_framework.test import APIClient
+
+from api.services import shopping_list
+from api.tests.base import SeededTestCase
+
+
+class FavoriteAndCartTests(SeededTestCase):
+
+    def test_favorite_and_cart(self):
+        recipe = self.recipes[1]
+        # событие для популярных за неделю; избранное обновляет счётчик
+        # рецепта, корзина - сохранённый список покупок; всё в одной
+        # транзакции (в тесте это SAVEPOINT и RELEASE)
+        for action, budget in (('favorite', 9), ('shopping_cart', 14)):
+            url = f'/api/recipes/{recipe.id}/{action}/'
+            with self.assertNumQueries(budget):
+                self.assertEqual(self.client.post(url).status_code, 201)
+            self.assertEqual(self.client.delete(url).status_code, 204)
+
+    def test_repeated_delete_changes_nothing(self):
+        recipe = self.recipes[2]
+        url = f'/api/recipes/{recipe.id}/shopping_cart/'
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.client.post(f'/api/recipes/{recipe.id}/favorite/')
+        for action in ('shopping_cart', 'favorite'):
+            url = f'/api/recipes/{recipe.id}/{action}/'
+            self.assertEqual(self.client.delete(url).status_code, 204)
+            # второй DELETE ничего не удаляет и ничего не вычитает
+            self.assertEqual(self.client.delete(url).status_code, 404)
+        recipe.refresh_from_db()
+        self.assertEqual(
+            recipe.favorites_count, recipe.favorites.count()
+        )
+        self.assertEqual(
+            shopping_list.stored_totals([self.user]),
+            shopping_list.live_totals([self.user])
+        )
+
+    def test_bulk_favorite_and_cart(self):
+        user = self.users[1]
+        client = APIClient()
+        client.force_authenticate(user)
+        # + блокировка строки пользователя
+        for size in (5, 50):
+            ids = [recipe.id for recipe in self.recipes[:size]]
+            for action, budget in (('favorite', 8), ('shopping_cart', 13)):
+                url = f'/api/recipes/{action}/'
+                with self.assertNumQueries(budget):
+                    response = client.post(
+                        url, {'recipes': ids}, format='json'
+                    )
+                self.assertEqual(response.status_code, 201)
+                self.assertEqual(
+                    [recipe['id'] for recipe in response.data], ids
+                )
+        self.assertEqual(user.favorites.count(), 50)
+        self.assertEqual(
+            shopping_list.stored_totals([user]),
+            shopping_list.live_totals([user])
+        )
+        response = client.delete(
+            '/api/recipes/shopping_cart/',
+            {'recipes': ids[10:]}, format='json'
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(user.shopping_cart.count(), 10)
+        self.assertEqual(
+            shopping_list.stored_totals([user]),
+            shopping_list.live_totals([user])
+        )
+        response = client.post(
+            '/api/recipes/favorite/', {'recipes': [0, 10 ** 9]}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
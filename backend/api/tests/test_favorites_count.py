@@ -0,0 +1,114 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api import caching
+from api.services import favorites
+from recipes.models import Favorites, Recipes
+from users.models import User
+
+
+class FavoritesCountTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create(username=name, email=f'{name}@ya.ru')
+            for name in ('first', 'second')
+        ]
+        cls.recipes = [
+            Recipes.objects.create(
+                author=cls.users[0], name=f'Рецепт {number}',
+                text='Описание', image='recipes/test.png', cooking_time=5
+            )
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def counts(self):
+        return list(
+            Recipes.objects.order_by('id').values_list(
+                'favorites_count', flat=True
+            )
+        )
+
+    def test_counter_follows_favorites(self):
+        first, second = map(self.client_for, self.users)
+        recipe = self.recipes[0]
+        # анонимный ответ уже в кэше, счётчик в нём должен обновиться
+        self.assertEqual(
+            self.client.get(f'/api/recipes/{recipe.id}/').data[
+                'favorites_count'
+            ], 0
+        )
+        # версии кэша меняются после фиксации транзакции
+        with self.captureOnCommitCallbacks(execute=True):
+            first.post(f'/api/recipes/{recipe.id}/favorite/')
+            first.post(f'/api/recipes/{recipe.id}/favorite/')
+            second.post('/api/recipes/favorite/', {
+                'recipes': [recipe.id for recipe in self.recipes[:2]]
+            }, format='json')
+        self.assertEqual(self.counts(), [2, 1, 0])
+        self.assertEqual(
+            self.client.get(f'/api/recipes/{recipe.id}/').data[
+                'favorites_count'
+            ], 2
+        )
+        response = self.client.get('/api/recipes/?ordering=popular')
+        self.assertEqual(
+            [item['name'] for item in response.data['results']],
+            ['Рецепт 0', 'Рецепт 1', 'Рецепт 2']
+        )
+        first.delete(f'/api/recipes/{recipe.id}/favorite/')
+        second.delete('/api/recipes/favorite/', {
+            'recipes': [self.recipes[1].id]
+        }, format='json')
+        self.assertEqual(self.counts(), [1, 0, 0])
+        self.users[1].delete()
+        self.assertEqual(self.counts(), [0, 0, 0])
+        # счётчик, уже разошедшийся с таблицей, не уходит ниже нуля
+        favorites.remove([recipe.id])
+        self.assertEqual(self.counts(), [0, 0, 0])
+
+    def test_lists_see_counters_after_delay(self):
+        url = '/api/recipes/?ordering=popular'
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertEqual(response.data['results'][0]['favorites_count'], 0)
+        last = self.recipes[-1]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client_for(self.users[0]).post(
+                f'/api/recipes/{last.id}/favorite/'
+            )
+        # до истечения снимка версии список остаётся прежним
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        cache.delete(caching.COUNTERS_SNAPSHOT)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['name'], last.name)
+        self.assertEqual(response.data['results'][0]['favorites_count'], 1)
+
+    def test_invalid_ordering(self):
+        response = self.client.get('/api/recipes/?ordering=name')
+        self.assertEqual(response.status_code, 400)
+
+    def test_reconcile(self):
+        Favorites.objects.bulk_create([
+            Favorites(user=user, recipe=self.recipes[2])
+            for user in self.users
+        ])
+        Recipes.objects.filter(id=self.recipes[0].id).update(
+            favorites_count=5
+        )
+        self.assertEqual(favorites.reconcile(), 2)
+        self.assertEqual(self.counts(), [0, 0, 2])
+        self.assertEqual(favorites.reconcile(), 0)
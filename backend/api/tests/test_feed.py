@@ -0,0 +1,118 @@
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.services import feed
+from recipes.models import FeedEntry, Recipes
+from users.models import Subscribtion, User
+
+
+@mock.patch.object(feed, 'PULL_RECIPES', 2)
+class FeedTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create(
+            username='reader', email='reader@ya.ru'
+        )
+        cls.author = User.objects.create(
+            username='author', email='author@ya.ru'
+        )
+        # у плодовитого автора рецептов больше FEED_PULL_RECIPES
+        cls.prolific = User.objects.create(
+            username='prolific', email='prolific@ya.ru'
+        )
+        cls.recipes = [
+            Recipes.objects.create(
+                author=author, name=f'{author.username} {number}',
+                text='Описание', image='recipes/test.png', cooking_time=5
+            )
+            for number in range(3)
+            for author in (cls.author, cls.prolific)
+            if author == cls.prolific or number < 2
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def subscribe(self, author):
+        response = self.client.post(f'/api/users/{author.id}/subscribe/')
+        self.assertEqual(response.status_code, 201)
+
+    def read_feed(self, limit=2, queries=7):
+        names = []
+        url = f'/api/recipes/feed/?limit={limit}'
+        while url:
+            # подписки на pull-авторов, записи ленты, их рецепты и рецепты
+            # для сериализатора с тремя prefetch
+            with self.assertNumQueries(queries):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            names += [recipe['name'] for recipe in response.data['results']]
+            url = response.data['next']
+        return names
+
+    def test_subscription_backfills_and_prunes(self):
+        self.subscribe(self.author)
+        self.subscribe(self.prolific)
+        # рецепты плодовитого автора в ленту не копируются
+        self.assertEqual(
+            set(FeedEntry.objects.values_list('author_id', flat=True)),
+            {self.author.id}
+        )
+        self.assertEqual(
+            self.read_feed(),
+            [recipe.name for recipe in reversed(self.recipes)]
+        )
+        response = self.client.delete(
+            f'/api/users/{self.author.id}/subscribe/'
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(
+            self.read_feed(limit=10),
+            ['prolific 2', 'prolific 1', 'prolific 0']
+        )
+
+    def test_new_recipe_is_fanned_out(self):
+        self.subscribe(self.author)
+        with mock.patch.object(feed, 'executor') as executor:
+            with self.captureOnCommitCallbacks(execute=True):
+                recipe = Recipes.objects.create(
+                    author=self.author, name='Новый', text='Описание',
+                    image='recipes/test.png', cooking_time=5
+                )
+        executor.submit.assert_called_once_with(feed.process, recipe.id)
+        self.assertEqual(feed.fan_out(recipe.id), 1)
+        self.assertEqual(
+            self.read_feed(queries=6), ['Новый', 'author 1', 'author 0']
+        )
+
+    def test_rebuild(self):
+        Subscribtion.objects.bulk_create([
+            Subscribtion(user=self.reader, author=self.author),
+            Subscribtion(user=self.reader, author=self.prolific),
+        ])
+        self.assertEqual(feed.rebuild(), 2)
+        self.assertEqual(len(self.read_feed()), 5)
+
+    @override_settings(FEED_PULL_RECIPES=2)
+    def test_migration_fills_feed(self):
+        migration = import_module('recipes.migrations.0012_feedentry')
+        Subscribtion.objects.bulk_create([
+            Subscribtion(user=self.reader, author=self.author),
+            Subscribtion(user=self.reader, author=self.prolific),
+        ])
+        migration.fill_feed(apps, None)
+        self.assertEqual(
+            set(FeedEntry.objects.values_list('recipe__name', flat=True)),
+            {'author 0', 'author 1'}
+        )
+        # результат совпадает с пересборкой
+        self.assertEqual(feed.rebuild(), 2)
@@ -0,0 +1,51 @@
+import tempfile
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from api.services import images
+from recipes.models import Recipes
+from users.models import User
+
+
+class ImageVariantsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media = override_settings(MEDIA_ROOT=directory.name)
+        media.enable()
+        self.addCleanup(media.disable)
+        buffer = BytesIO()
+        Image.new('RGBA', (800, 400), '#E26C2D').save(buffer, 'PNG')
+        self.name = default_storage.save(
+            'recipes/test.png', ContentFile(buffer.getvalue())
+        )
+        author = User.objects.create(username='author', email='a@ya.ru')
+        self.recipe = Recipes.objects.create(
+            author=author, name='Рецепт', text='Описание',
+            image=self.name, cooking_time=5
+        )
+
+    def test_variants_appear_once_built(self):
+        url = f'/api/recipes/{self.recipe.id}/'
+        # копий ещё нет - ссылок на них тоже
+        self.assertIsNone(self.client.get(url).data['images'])
+        images.make_variants(self.name)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(images.mark_ready(self.name), 1)
+        variants = self.client.get(url).data['images']
+        self.assertEqual(set(variants), set(images.VARIANTS))
+        for variant, size in images.VARIANTS.items():
+            for extension in images.FORMATS:
+                name = images.variant_name(self.name, variant, extension)
+                self.assertTrue(variants[variant][extension].endswith(name))
+                with default_storage.open(name) as file:
+                    self.assertEqual(
+                        max(Image.open(file).size), min(size, 800)
+                    )
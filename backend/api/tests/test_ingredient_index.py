@@ -0,0 +1,65 @@
+from django.db import DatabaseError, transaction
+from django.test import TestCase
+
+from api.services.ingredient_index import ingredient_index
+from recipes.models import Ingredients
+
+
+class IngredientIndexTests(TestCase):
+
+    def test_remove_prunes_trie(self):
+        salt = Ingredients.objects.create(name='Соль', measurement_unit='г')
+        ingredient_index.build()
+        ingredient_index.remove(salt)
+        self.assertEqual(ingredient_index._trie, {})
+        self.assertEqual(ingredient_index._postings, {})
+        self.assertEqual(ingredient_index.search('со'), [])
+
+    def test_search_uses_old_index_while_rebuilding(self):
+        Ingredients.objects.create(name='Соль', measurement_unit='г')
+        ingredient_index.build()
+        ingredient_index._built_at -= ingredient_index.rebuild_interval + 1
+        with ingredient_index._build_lock:
+            # перестроением занят другой поток
+            self.assertEqual(
+                [item['name'] for item in ingredient_index.search('со')],
+                ['Соль']
+            )
+
+    def test_short_query_matches_only_prefix(self):
+        Ingredients.objects.bulk_create([
+            Ingredients(name='Соль', measurement_unit='г'),
+            Ingredients(name='Фасоль', measurement_unit='г'),
+        ])
+        ingredient_index.build()
+        self.assertEqual(
+            [item['name'] for item in ingredient_index.search('со')],
+            ['Соль']
+        )
+        self.assertEqual(
+            [item['name'] for item in ingredient_index.search('сол')],
+            ['Соль', 'Фасоль']
+        )
+
+    def test_index_changes_after_commit(self):
+        ingredient_index.build()
+        try:
+            with transaction.atomic():
+                with self.captureOnCommitCallbacks():
+                    Ingredients.objects.create(
+                        name='Соль', measurement_unit='г'
+                    )
+                self.assertEqual(ingredient_index.search('со'), [])
+                raise DatabaseError
+        except DatabaseError:
+            pass
+        # транзакция откатилась, индекс не изменился
+        self.assertEqual(ingredient_index.search('со'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            salt = Ingredients.objects.create(
+                name='Соль', measurement_unit='г'
+            )
+        self.assertEqual(ingredient_index.search('со')[0]['id'], salt.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            salt.delete()
+        self.assertEqual(ingredient_index.search('со'), [])
@@ -0,0 +1,34 @@
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from api import caching
+from api.services.ingredient_index import ingredient_index
+from recipes.models import Ingredients
+
+
+class LoadDataTests(TestCase):
+
+    def test_load_resets_caches_and_reports_inserted_rows(self):
+        Ingredients.objects.create(name='Соль', measurement_unit='г')
+        ingredient_index.build()
+        version = caching.get_version(caching.INGREDIENTS_VERSION)
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.csv', encoding='utf-8'
+        ) as file:
+            file.write('Соль,г\nПерец,г\nПерец,г\n')
+            file.flush()
+            output = StringIO()
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command('load_data', file.name, stdout=output)
+        self.assertIn('Добавлено ингредиентов: 1, уже были в базе: 2',
+                      output.getvalue())
+        self.assertNotEqual(
+            caching.get_version(caching.INGREDIENTS_VERSION), version
+        )
+        self.assertEqual(
+            [item['name'] for item in ingredient_index.search('пер')],
+            ['Перец']
+        )
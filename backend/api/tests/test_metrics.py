@@ -0,0 +1,50 @@
+import atexit
+import tempfile
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.metrics import Registry
+from users.models import User
+
+
+class MetricsTests(TestCase):
+
+    def test_admin_only(self):
+        user = User.objects.create(username='user', email='user@ya.ru')
+        admin = User.objects.create(
+            username='admin', email='admin@ya.ru', is_staff=True
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        self.assertEqual(client.get('/api/metrics').status_code, 403)
+        self.client.get('/api/tags/')
+        client.force_authenticate(admin)
+        response = client.get('/api/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            'http_requests_total{method="GET",route="tags-list",'
+            'status="200"}',
+            response.content.decode()
+        )
+
+    def test_processes_are_summed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            workers = [Registry(directory), Registry(directory)]
+            for worker in workers:
+                atexit.unregister(worker.flush)
+                worker.inc('http_requests_total', {'route': 'tags-list'})
+                worker.observe(
+                    'http_request_db_queries', {'route': 'tags-list'}, 1
+                )
+            workers[1].flush()
+            output = workers[0].render()
+        self.assertIn('http_requests_total{route="tags-list"} 2', output)
+        self.assertIn(
+            'http_request_db_queries_bucket{route="tags-list",le="1"} 2',
+            output
+        )
+        self.assertIn(
+            'http_request_db_queries_bucket{route="tags-list",le="0"} 0',
+            output
+        )
@@ -0,0 +1,53 @@
+import os
+import pstats
+import tempfile
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+
+class ProfilingMiddlewareTests(TestCase):
+
+    def test_server_timing(self):
+        response = self.client.get('/api/tags/')
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'desc="1 queries"', 'view;dur=',
+                       'render;dur=', 'total;dur='):
+            self.assertIn(metric, timing)
+
+    def test_sampled_profile_dump(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(
+                PROFILING_SAMPLE_RATE=1, PROFILING_DUMP_DIR=directory
+            ):
+                self.client.get('/api/tags/')
+            dumps = os.listdir(directory)
+            self.assertEqual(len(dumps), 1)
+            pstats.Stats(os.path.join(directory, dumps[0]))
+
+    def test_dumps_are_rotated(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(
+                PROFILING_SAMPLE_RATE=1, PROFILING_DUMP_DIR=directory,
+                PROFILING_DUMP_LIMIT=2
+            ):
+                for _ in range(3):
+                    self.client.get('/api/tags/')
+            self.assertEqual(len(os.listdir(directory)), 2)
+
+    def test_no_dumps_by_default(self):
+        with override_settings(PROFILING_SLOW_MS=0):
+            with self.assertLogs('api.middleware', 'WARNING'):
+                self.client.get('/api/tags/')
+                self.client.get('/api/tags/')
+        self.assertIsNone(settings.PROFILING_DUMP_DIR)
+
+    @override_settings(PROFILING_SLOW_MS=0)
+    def test_slow_request_profiles_next_one(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(PROFILING_DUMP_DIR=directory):
+                with self.assertLogs('api.middleware', 'WARNING'):
+                    self.client.get('/api/tags/')
+                    self.assertEqual(os.listdir(directory), [])
+                    self.client.get('/api/tags/')
+                self.assertEqual(len(os.listdir(directory)), 1)
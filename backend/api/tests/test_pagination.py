@@ -0,0 +1,57 @@
+import base64
+import json
+
+from recipes.models import Recipes
+from users.models import Subscribtion
+from api.tests.base import SeededTestCase
+
+
+def cursor(position):
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+class KeysetPaginationTests(SeededTestCase):
+
+    def test_recipe_list_cursor(self):
+        self.assertFlat(4, '/api/recipes/?cursor=')
+
+    def walk(self, url, key):
+        """Пройти все страницы по ссылкам next"""
+        found = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            found += [item[key] for item in response.data['results']]
+            url = response.data['next']
+        return found
+
+    def test_pages_have_no_gaps_or_duplicates(self):
+        # несколько рецептов с одинаковым pub_date: порядок решает id
+        Recipes.objects.filter(id__in=[
+            recipe.id for recipe in self.recipes[:20]
+        ]).update(pub_date=self.recipes[0].pub_date)
+        self.assertEqual(
+            self.walk('/api/recipes/?cursor=&limit=7', 'id'),
+            list(Recipes.objects.order_by('-pub_date', '-id').values_list(
+                'id', flat=True
+            ))
+        )
+        self.assertEqual(
+            self.walk('/api/users/subscriptions/?cursor=&limit=7', 'id'),
+            list(Subscribtion.objects.filter(user=self.user).order_by(
+                'author__username', 'author_id'
+            ).values_list('author_id', flat=True))
+        )
+
+    def test_tampered_cursor(self):
+        for url, value in (
+            ('/api/recipes/', 'не base64'),
+            ('/api/recipes/', cursor(['x', 1])),
+            ('/api/recipes/', cursor(['2026-10-18T12:00:00+00:00', '1'])),
+            ('/api/recipes/', cursor(['2026-10-18T12:00:00+00:00'])),
+            ('/api/recipes/', cursor({'pub_date': 1})),
+            ('/api/recipes/feed/', cursor(['x', 1])),
+            ('/api/users/subscriptions/', cursor([1, 1])),
+        ):
+            response = self.client.get(url, {'cursor': value})
+            self.assertEqual(response.status_code, 404, (url, value))
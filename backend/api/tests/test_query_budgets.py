@@ -0,0 +1,92 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.tests.base import SeededTestCase, seed_recipes
+from recipes.models import Favorites
+from users.models import Subscribtion, User
+
+
+class QueryBudgetTests(SeededTestCase):
+    """Число запросов к БД на каждый эндпоинт не растёт вместе с данными.
+
+    Бюджеты ниже - верхняя граница: если тест упал, значит в сериализатор
+    или представление вернулся запрос на каждую строку.
+    """
+
+    def test_recipe_list(self):
+        # COUNT(*), рецепты, теги, авторы, ингредиенты
+        self.assertFlat(5, '/api/recipes/')
+
+    def test_recipe_list_anonymous(self):
+        self.assertFlat(5, '/api/recipes/', self.anonymous)
+
+    def test_filtered_recipe_lists(self):
+        author = self.users[5]
+        for params, budget in (
+            (f'author={author.id}', 5),
+            ('is_favorited=1', 5),
+            ('is_in_shopping_cart=1', 5),
+            # + проверка слагов тегов в фильтре
+            ('tags=breakfast&tags=lunch', 6),
+            (f'is_favorited=1&author={author.id}&tags=dinner', 6),
+        ):
+            self.assertFlat(budget, f'/api/recipes/?{params}')
+
+    def test_recipe_detail(self):
+        self.assertQueries(4, f'/api/recipes/{self.recipes[0].id}/')
+        self.assertQueries(
+            4, f'/api/recipes/{self.recipes[1].id}/', self.anonymous
+        )
+
+    def test_subscriptions(self):
+        # COUNT(*), авторы, рецепты авторов
+        self.assertFlat(3, '/api/users/subscriptions/?recipes_limit=3')
+        self.assertFlat(3, '/api/users/subscriptions/')
+
+    def test_users(self):
+        self.assertQueries(1, '/api/users/')
+        self.assertQueries(1, f'/api/users/{self.users[1].id}/')
+
+    def test_ingredients(self):
+        self.assertQueries(1, '/api/ingredients/', self.anonymous)
+        # автодополнение обслуживается индексом в памяти
+        self.assertQueries(0, '/api/ingredients/?name=ингр', self.anonymous)
+
+    def test_tags(self):
+        self.assertQueries(1, '/api/tags/', self.anonymous)
+
+    def test_download_shopping_cart(self):
+        self.assertQueries(1, '/api/recipes/download_shopping_cart/')
+
+    def test_budgets_do_not_grow_with_data(self):
+        urls = (
+            '/api/recipes/?limit=20',
+            '/api/recipes/?is_favorited=1&limit=20',
+            '/api/users/subscriptions/?recipes_limit=5&limit=20',
+            '/api/users/',
+        )
+        budgets = {url: self.count_queries(url) for url in urls}
+        User.objects.bulk_create([
+            User(username=f'extra{number}', email=f'extra{number}@ya.ru')
+            for number in range(20)
+        ])
+        new_users = list(User.objects.filter(username__startswith='extra'))
+        recipes = seed_recipes(
+            new_users, self.tags, self.ingredients, 'Новый', 5
+        )
+        Favorites.objects.bulk_create([
+            Favorites(user=self.user, recipe=recipe) for recipe in recipes
+        ])
+        Subscribtion.objects.bulk_create([
+            Subscribtion(user=self.user, author=author)
+            for author in new_users
+        ])
+        for url, budget in budgets.items():
+            self.assertEqual(self.count_queries(url), budget, url)
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(context)
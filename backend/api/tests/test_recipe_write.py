@@ -0,0 +1,127 @@
+import tempfile
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api.services import shopping_list
+from api.tests.base import IMAGE, SeededTestCase
+
+
+class RecipeWriteTests(SeededTestCase):
+
+    def test_recipe_update_writes_only_changes(self):
+        # рецепт в корзине у автора, список покупок тоже меняется
+        recipe = next(
+            recipe for recipe in self.recipes[::4]
+            if recipe.author_id == self.user.id
+        )
+        rows = list(recipe.recipe.order_by('id'))
+        ingredients = [
+            {'id': row.ingredients_id, 'amount': row.amount} for row in rows
+        ]
+        ingredients[0]['amount'] += 5
+        url = f'/api/recipes/{recipe.id}/'
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch(
+                url, {'ingredients': ingredients}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        writes = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+            and 'recipesingredients' in query['sql']
+        ]
+        self.assertEqual(len(writes), 1, writes)
+        self.assertEqual(
+            list(recipe.recipe.order_by('id').values_list('id', flat=True)),
+            [row.id for row in rows]
+        )
+        self.assertEqual(
+            shopping_list.stored_totals([self.user]),
+            shopping_list.live_totals([self.user])
+        )
+        response = self.client.patch(url, {
+            'ingredients': ingredients[1:] + [
+                {'id': self.ingredients[0].id, 'amount': 1}
+            ],
+            'tags': [self.tags[2].id],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(row['id'] for row in response.data['ingredients']),
+            sorted([row.ingredients_id for row in rows[1:]]
+                   + [self.ingredients[0].id])
+        )
+        self.assertEqual(
+            [tag['id'] for tag in response.data['tags']], [self.tags[2].id]
+        )
+        self.assertEqual(
+            shopping_list.stored_totals([self.user]),
+            shopping_list.live_totals([self.user])
+        )
+
+    def test_noop_update_changes_nothing(self):
+        recipe = next(
+            recipe for recipe in self.recipes
+            if recipe.author_id == self.user.id
+        )
+        data = {
+            'name': recipe.name,
+            'ingredients': [
+                {'id': row.ingredients_id, 'amount': row.amount}
+                for row in recipe.recipe.all()
+            ],
+            'tags': list(recipe.tags.values_list('id', flat=True)),
+        }
+        with CaptureQueriesContext(connection) as context:
+            with self.captureOnCommitCallbacks() as callbacks:
+                response = self.client.patch(
+                    f'/api/recipes/{recipe.id}/', data, format='json'
+                )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+        ], [])
+        # ни сброса кэша, ни переиндексации
+        self.assertEqual(callbacks, [])
+
+    def create_recipe(self, ingredients, tags):
+        with tempfile.TemporaryDirectory() as media:
+            with override_settings(MEDIA_ROOT=media):
+                return self.client.post('/api/recipes/', {
+                    'name': f'Новый рецепт {len(ingredients)}',
+                    'text': 'Описание',
+                    'cooking_time': 15,
+                    'image': IMAGE,
+                    'tags': tags,
+                    'ingredients': [
+                        {'id': pk, 'amount': 10} for pk in ingredients
+                    ],
+                }, format='json')
+
+    def test_recipe_create_validation_is_batched(self):
+        tags = [tag.id for tag in self.tags]
+        budgets = set()
+        for count in (2, 30):
+            ingredients = [item.id for item in self.ingredients[:count]]
+            with CaptureQueriesContext(connection) as context:
+                response = self.create_recipe(ingredients, tags)
+            self.assertEqual(response.status_code, 201, response.data)
+            budgets.add(len(context))
+        self.assertEqual(len(budgets), 1, budgets)
+
+    def test_recipe_create_item_errors(self):
+        first, second = self.ingredients[:2]
+        response = self.create_recipe(
+            [first.id, 10 ** 9, second.id, first.id],
+            [self.tags[0].id, 10 ** 9, self.tags[0].id]
+        )
+        self.assertEqual(response.status_code, 400)
+        errors = response.data['ingredients']
+        self.assertEqual(errors[0], {})
+        self.assertIn('не найден', errors[1]['id'][0])
+        self.assertEqual(errors[2], {})
+        self.assertIn('повторяется', errors[3]['id'][0])
+        self.assertEqual(set(response.data['tags']), {1, 2})
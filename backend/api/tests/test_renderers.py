@@ -0,0 +1,102 @@
+import csv
+import io
+import json
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredients, Recipes, RecipesIngredients
+from users.models import User
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+class ShoppingListRendererTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='user', email='user@ya.ru')
+        salt, sugar = [
+            Ingredients.objects.create(name=name, measurement_unit='г')
+            for name in ('Соль', 'Сахар, тростниковый')
+        ]
+        cls.recipes = [
+            Recipes.objects.create(
+                author=cls.user, name=f'Рецепт {number}', text='Описание',
+                image='recipes/test.png', cooking_time=5
+            )
+            for number in range(2)
+        ]
+        RecipesIngredients.objects.bulk_create([
+            RecipesIngredients(
+                recipes=cls.recipes[0], ingredients=salt, amount=5
+            ),
+            RecipesIngredients(
+                recipes=cls.recipes[1], ingredients=salt, amount=7
+            ),
+            RecipesIngredients(
+                recipes=cls.recipes[1], ingredients=sugar, amount=100
+            ),
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for recipe in self.recipes:
+            self.client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+
+    def download(self, content_type, **kwargs):
+        response = self.client.get(URL, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response['Content-Type'], f'{content_type}; charset=utf-8'
+        )
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        for kwargs in (
+            {'HTTP_ACCEPT': 'text/csv'}, {'data': {'format': 'csv'}}
+        ):
+            response, body = self.download('text/csv', **kwargs)
+            self.assertEqual(
+                response['Content-Disposition'],
+                'attachment; filename=shopping_cart.csv'
+            )
+            # запятая в названии не ломает колонки
+            self.assertEqual(list(csv.reader(io.StringIO(body))), [
+                ['name', 'measurement_unit', 'amount'],
+                ['Соль', 'г', '12'],
+                ['Сахар, тростниковый', 'г', '100'],
+            ])
+
+    def test_json(self):
+        for kwargs in (
+            {'HTTP_ACCEPT': 'application/json'}, {'data': {'format': 'json'}}
+        ):
+            response, body = self.download('application/json', **kwargs)
+            self.assertEqual(
+                response['Content-Disposition'],
+                'attachment; filename=shopping_cart.json'
+            )
+            self.assertEqual(json.loads(body), [
+                {'name': 'Соль', 'measurement_unit': 'г', 'amount': 12},
+                {
+                    'name': 'Сахар, тростниковый',
+                    'measurement_unit': 'г',
+                    'amount': 100,
+                },
+            ])
+
+    def test_empty_json_list(self):
+        for recipe in self.recipes:
+            self.client.delete(f'/api/recipes/{recipe.id}/shopping_cart/')
+        _, body = self.download('application/json', data={'format': 'json'})
+        self.assertEqual(json.loads(body), [])
+
+    def test_text_is_default(self):
+        _, body = self.download('text/plain')
+        self.assertEqual(
+            body, 'Соль - 12 г\nСахар, тростниковый - 100 г\n'
+        )
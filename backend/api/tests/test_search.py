@@ -0,0 +1,127 @@
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.services import search
+from recipes.models import (
+    Ingredients, Recipes, RecipesIngredients, SearchDocument
+)
+from users.models import User
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(
+            username='author', email='author@ya.ru'
+        )
+        cls.other = User.objects.create(username='other', email='other@ya.ru')
+        cls.potato = Ingredients.objects.create(
+            name='картофель', measurement_unit='г'
+        )
+        cls.recipes = [
+            Recipes.objects.create(
+                author=author, name=name, text=text,
+                image='recipes/test.png', cooking_time=10
+            )
+            for author, name, text in (
+                (cls.author, 'Грибной суп', 'Варить час'),
+                (cls.author, 'Овощное рагу', 'Подавать вместо супа'),
+                (cls.author, 'Пюре', 'Размять'),
+                (cls.other, 'Суп с клёцками', 'Варить'),
+            )
+        ]
+        RecipesIngredients.objects.create(
+            recipes=cls.recipes[2], ingredients=cls.potato, amount=1
+        )
+        search.rebuild()
+
+    def setUp(self):
+        cache.clear()
+
+    def found(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [recipe['name'] for recipe in response.data['results']]
+
+    def test_ranking_and_stemming(self):
+        # "супы" и "суп" - одна основа, название весит больше описания
+        self.assertEqual(
+            self.found('/api/recipes/?search=супы'),
+            ['Суп с клёцками', 'Грибной суп', 'Овощное рагу']
+        )
+        self.assertEqual(self.found('/api/recipes/?search=картофеля'),
+                         ['Пюре'])
+        self.assertEqual(self.found('/api/recipes/?search=кофе'), [])
+
+    def test_filters_are_applied(self):
+        self.assertEqual(
+            self.found(
+                f'/api/recipes/?search=суп&author={self.author.id}'
+            ),
+            ['Грибной суп', 'Овощное рагу']
+        )
+
+    def test_postings_are_limited(self):
+        # по каждой основе читается одна строка: "Овощное рагу" попадает
+        # в кандидаты по "рагу", а вклад "супа" в описании досчитывается
+        full = search.search('суп рагу')
+        self.assertEqual(len(full), 3)
+        with mock.patch.object(search, 'POSTINGS_LIMIT', 1):
+            limited = search.search('суп рагу')
+        self.assertEqual(len(limited), 2)
+        self.assertIn(self.recipes[1].id, limited)
+        self.assertEqual(limited, [pk for pk in full if pk in limited])
+
+    def test_index_follows_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.potato.name = 'батат'
+            self.potato.save()
+        self.assertEqual(self.found('/api/recipes/?search=батат'), ['Пюре'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipes[1].name = 'Рагу без мяса'
+            self.recipes[1].text = 'Тушить'
+            self.recipes[1].save()
+        self.assertEqual(
+            self.found('/api/recipes/?search=суп'),
+            ['Суп с клёцками', 'Грибной суп']
+        )
+
+    def test_reindex_invalidates_cached_lists(self):
+        self.assertEqual(self.found('/api/recipes/?search=борщ'), [])
+        # строки индекса меняются позже сигнала сохранения рецепта
+        Recipes.objects.filter(pk=self.recipes[2].pk).update(name='Борщ')
+        with self.captureOnCommitCallbacks(execute=True):
+            search.reindex([self.recipes[2].pk])
+        self.assertEqual(self.found('/api/recipes/?search=борщ'), ['Борщ'])
+
+    def test_ingredient_recipes_are_reindexed_in_batches(self):
+        for recipe in self.recipes[:2]:
+            RecipesIngredients.objects.create(
+                recipes=recipe, ingredients=self.potato, amount=1
+            )
+        with mock.patch.object(search, 'reindex', wraps=search.reindex) as \
+                reindex:
+            search.reindex_ingredient(self.potato.pk, batch_size=2)
+        self.assertEqual(
+            [call.args[0] for call in reindex.call_args_list],
+            [
+                [self.recipes[0].id, self.recipes[1].id],
+                [self.recipes[2].id],
+            ]
+        )
+
+    def test_migration_builds_index(self):
+        migration = import_module('recipes.migrations.0011_search_index')
+        SearchDocument.objects.all().delete()
+        self.assertEqual(self.found('/api/recipes/?search=суп'), [])
+        cache.clear()
+        migration.build_index(apps, None)
+        self.assertEqual(
+            self.found('/api/recipes/?search=супы'),
+            ['Суп с клёцками', 'Грибной суп', 'Овощное рагу']
+        )
@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import Sum
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.services import trending
+from recipes.models import RecipeActivity, RecipeEvent, Recipes
+from users.models import User
+
+
+class TrendingTests(TestCase):
+    now = datetime(2026, 10, 18, 12, 30, tzinfo=timezone.utc)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create(username=name, email=f'{name}@ya.ru')
+            for name in ('first', 'second')
+        ]
+        cls.recipes = [
+            Recipes.objects.create(
+                author=cls.users[number % 2], name=f'Рецепт {number}',
+                text='Описание', image='recipes/test.png', cooking_time=5
+            )
+            for number in range(4)
+        ]
+
+    def events(self, recipe, kind, *hours_ago):
+        RecipeEvent.objects.bulk_create([
+            RecipeEvent(
+                recipe=recipe, kind=kind,
+                created=self.now - timedelta(hours=hours)
+            )
+            for hours in hours_ago
+        ])
+
+    def test_events_are_recorded(self):
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+        recipe = self.recipes[0]
+        client.post(f'/api/recipes/{recipe.id}/favorite/')
+        client.post(f'/api/recipes/{recipe.id}/favorite/')
+        client.post('/api/recipes/shopping_cart/', {
+            'recipes': [recipe.id for recipe in self.recipes[:2]]
+        }, format='json')
+        self.assertEqual(
+            sorted(RecipeEvent.objects.values_list('recipe_id', 'kind')),
+            [(self.recipes[0].id, RecipeEvent.FAVORITE),
+             (self.recipes[0].id, RecipeEvent.CART),
+             (self.recipes[1].id, RecipeEvent.CART)]
+        )
+
+    def test_rollup(self):
+        recipe = self.recipes[0]
+        # два события позапрошлого часа, одно вчерашнее и одно текущего часа
+        self.events(recipe, RecipeEvent.FAVORITE, 1, 1, 20, 0)
+        self.events(recipe, RecipeEvent.CART, 1)
+        self.assertEqual(trending.rollup(self.now), 4)
+        self.assertEqual(RecipeEvent.objects.filter(rolled=False).count(), 1)
+        buckets = {
+            (row.period, row.start.hour, row.start.day): (
+                row.favorites, row.carts
+            )
+            for row in RecipeActivity.objects.all()
+        }
+        self.assertEqual(buckets, {
+            ('hour', 11, 18): (2, 1),
+            ('hour', 16, 17): (1, 0),
+            ('day', 0, 18): (2, 1),
+            ('day', 0, 17): (1, 0),
+        })
+        # повторная свёртка складывается с уже свёрнутым
+        self.events(recipe, RecipeEvent.FAVORITE, 1)
+        trending.rollup(self.now)
+        self.assertEqual(
+            RecipeActivity.objects.get(period='day', start__day=18).favorites,
+            3
+        )
+        trending.rollup(self.now + timedelta(days=31))
+        self.assertFalse(RecipeActivity.objects.exists())
+        self.assertFalse(RecipeEvent.objects.exists())
+
+    def test_readding_is_counted_once(self):
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+        recipe = self.recipes[0]
+        url = f'/api/recipes/{recipe.id}/favorite/'
+        for _ in range(3):
+            self.assertEqual(client.post(url).status_code, 201)
+            self.assertEqual(client.delete(url).status_code, 204)
+        # и после свёртки повтор в пределах недели не учитывается
+        trending.rollup(datetime.now(timezone.utc) + timedelta(hours=2))
+        client.post(url)
+        other = APIClient()
+        other.force_authenticate(self.users[1])
+        other.post(url)
+        trending.rollup(datetime.now(timezone.utc) + timedelta(hours=2))
+        self.assertEqual(
+            RecipeActivity.objects.filter(period='day').aggregate(
+                total=Sum('favorites')
+            )['total'],
+            2
+        )
+
+    def test_trending_list(self):
+        first, second, third, _ = self.recipes
+        # много старых добавлений весят меньше нескольких свежих
+        self.events(first, RecipeEvent.FAVORITE, *[24 * 6] * 6)
+        self.events(second, RecipeEvent.FAVORITE, 2, 3)
+        self.events(third, RecipeEvent.CART, 2, 3, 5)
+        self.events(third, RecipeEvent.FAVORITE, 24 * 10)
+        trending.rollup(self.now)
+        self.assertEqual(trending.refresh(self.now), 3)
+        response = self.client.get('/api/recipes/trending/')
+        self.assertEqual(
+            [recipe['name'] for recipe in response.data['results']],
+            ['Рецепт 1', 'Рецепт 2', 'Рецепт 0']
+        )
+        response = self.client.get(
+            f'/api/recipes/trending/?author={self.users[0].id}'
+        )
+        self.assertEqual(
+            [recipe['name'] for recipe in response.data['results']],
+            ['Рецепт 2', 'Рецепт 0']
+        )
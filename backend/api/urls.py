@@ -1,6 +1,7 @@
 from rest_framework import routers
-from django.urls import include, path
+from django.urls import include, path, re_path
 
+from api.views import MetricsView
 from recipes.views import (
     IngredientsViewSet, TagViewSet, RecipesViewSet
 )
@@ -11,4 +12,7 @@ router.register(r'ingredients', IngredientsViewSet, basename='ingredients')
 router.register(r'tags', TagViewSet, basename='tags')
 router.register(r'recipes', RecipesViewSet, basename='recipes')
 
-urlpatterns = [path('', include(router.urls))]
+urlpatterns = [
+    re_path(r'^metrics/?$', MetricsView.as_view(), name='metrics'),
+    path('', include(router.urls)),
+]
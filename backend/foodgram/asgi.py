@@ -9,8 +9,16 @@ https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+# по умолчанию проект запускается под WSGI, этот модуль - по выбору;
+# под ASGI чтение горячих эндпоинтов идёт в пуле потоков
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
-application = get_asgi_application()
+django.setup(set_prefix=False)
+
+# как get_asgi_application, но потоковые ответы читаются вне цикла событий
+from api.async_views import ASGIHandler  # noqa: E402
+
+application = ASGIHandler()
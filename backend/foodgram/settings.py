@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 from dotenv import load_dotenv
 
@@ -35,6 +36,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,6 +78,79 @@ DATABASES = {
     }
 }
 
+# версии кэша ответов должны быть общими для всех процессов gunicorn,
+# иначе изменение в одном процессе не сбросит кэш остальных. Для
+# нескольких серверов задайте общий кэш, например
+# CACHE_BACKEND=django.core.cache.backends.memcached.PyMemcacheCache
+# и CACHE_LOCATION=memcached:11211 (нужен пакет pymemcache); по
+# умолчанию кэш лежит в файлах и общий для процессов одной машины.
+# LocMemCache годится только для одного процесса
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION',
+            default=os.path.join(tempfile.gettempdir(), 'foodgram_cache')
+        ),
+    }
+}
+
+RECIPES_CACHE_TIMEOUT = 60 * 15
+# версии кэша и ETag не хранятся вечно: после истечения версия
+# создаётся заново, клиенты один раз получают полный ответ
+CACHE_VERSION_TIMEOUT = 60 * 60 * 24
+# через сколько секунд списки рецептов показывают новые счётчики
+# избранного: чаще сбрасывать их кэш на каждое добавление дорого
+RECIPES_COUNTERS_DELAY = 60
+
+AUTH_TOKEN_CACHE_TIMEOUT = 60 * 5
+# LRU процесса не знает об изменениях в других процессах, поэтому
+# живёт недолго
+AUTH_TOKEN_CACHE_LOCAL_TIMEOUT = 5
+AUTH_TOKEN_CACHE_SIZE = 10000
+# пара (пользователь, токен) кладётся и в кэш Django, если он общий для
+# процессов; по умолчанию это определяется по CACHE_BACKEND
+AUTH_TOKEN_SHARED_CACHE = None
+
+# рецепты авторов, у которых рецептов больше этого числа, не
+# раскладываются по лентам подписчиков, а читаются при показе ленты
+FEED_PULL_RECIPES = 500
+
+# под ASGI чтение горячих эндпоинтов идёт в пуле потоков, см.
+# api.async_views; переменную окружения выставляет foodgram/asgi.py
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', default='False') == 'True'
+ASYNC_VIEWS_THREADS = int(os.getenv('ASYNC_VIEWS_THREADS', default=8))
+
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', default=0))
+PROFILING_SLOW_MS = int(os.getenv('PROFILING_SLOW_MS', default=1000))
+# дампы cProfile выключены, пока не задан каталог; старые дампы сверх
+# PROFILING_DUMP_LIMIT удаляются
+PROFILING_DUMP_DIR = os.getenv('PROFILING_DUMP_DIR')
+PROFILING_DUMP_LIMIT = int(os.getenv('PROFILING_DUMP_LIMIT', default=100))
+PROFILING_SERVER_TIMING = True
+
+# общий каталог метрик для нескольких процессов gunicorn
+METRICS_DIR = os.getenv('METRICS_DIR')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.middleware': {
+            'handlers': ['console'],
+            'level': os.getenv('PROFILING_LOG_LEVEL', default='WARNING'),
+        },
+    },
+}
+
 AUTH_USER_MODEL = 'users.User'
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -116,7 +191,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
 }
 
@@ -4,26 +4,41 @@ from .models import (
     Recipes, Ingredients, Tag, Favorites,
     RecipesIngredients
 )
+from .paginators import EstimatedCountPaginator
 
 
-class RecipesAdmin(admin.ModelAdmin):
+class ScalableAdmin(admin.ModelAdmin):
+    """Список без COUNT(*) по всей таблице и без списков на всю таблицу"""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class RecipesAdmin(ScalableAdmin):
     list_display = (
         'name',
         'author',
         'quantity_favorites'
     )
-    list_filter = ('author', 'name', 'tags',)
+    list_select_related = ('author',)
+    # фильтры по автору и названию выводили в боковую панель
+    # всех пользователей и все рецепты
+    list_filter = ('tags',)
+    search_fields = ('name', '^author__username')
+    autocomplete_fields = ('author', 'tags')
 
+    @admin.display(description='В избранном', ordering='favorites_count')
     def quantity_favorites(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
 
 
-class IngredientsAdmin(admin.ModelAdmin):
+class IngredientsAdmin(ScalableAdmin):
     list_display = (
         'name',
         'measurement_unit'
     )
-    list_filter = ('name',)
+    list_filter = ('measurement_unit',)
+    search_fields = ('^name',)
 
 
 class TagAdmin(admin.ModelAdmin):
@@ -32,23 +47,29 @@ class TagAdmin(admin.ModelAdmin):
         'color',
         'slug'
     )
+    search_fields = ('name',)
 
 
-class FavouritesAdmin(admin.ModelAdmin):
+class FavouritesAdmin(ScalableAdmin):
     list_display = (
         'id',
         'user',
         'recipe'
     )
-    list_filter = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    search_fields = ('^user__username', '^recipe__name')
+    autocomplete_fields = ('user', 'recipe')
 
 
-class RecipesIngredientsAdmin(admin.ModelAdmin):
+class RecipesIngredientsAdmin(ScalableAdmin):
     list_display = (
         'ingredients',
         'recipes',
         'amount'
     )
+    list_select_related = ('ingredients', 'recipes')
+    search_fields = ('^recipes__name', '^ingredients__name')
+    autocomplete_fields = ('ingredients', 'recipes')
 
 
 ADMINS_LIST = (
@@ -0,0 +1,64 @@
+# Generated by Django 3.2.13 on 2026-10-18 12:00
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicates(apps, schema_editor):
+    """Слить одинаковые ингредиенты в один с наименьшим id.
+
+    Ссылки из рецептов переносятся на оставшийся ингредиент; если он
+    уже есть в рецепте, количества складываются.
+    """
+    Ingredients = apps.get_model('recipes', 'Ingredients')
+    RecipesIngredients = apps.get_model('recipes', 'RecipesIngredients')
+    groups = Ingredients.objects.values(
+        'name', 'measurement_unit'
+    ).order_by().annotate(
+        total=Count('id'), keep=Min('id')
+    ).filter(total__gt=1)
+    for group in groups:
+        keep = group['keep']
+        duplicates = list(
+            Ingredients.objects.filter(
+                name=group['name'],
+                measurement_unit=group['measurement_unit']
+            ).exclude(id=keep).values_list('id', flat=True)
+        )
+        kept = {
+            row.recipes_id: row
+            for row in RecipesIngredients.objects.filter(ingredients_id=keep)
+        }
+        for row in RecipesIngredients.objects.filter(
+            ingredients_id__in=duplicates
+        ).order_by('id'):
+            target = kept.get(row.recipes_id)
+            if target is None:
+                row.ingredients_id = keep
+                row.save(update_fields=['ingredients'])
+                kept[row.recipes_id] = row
+            else:
+                target.amount += row.amount
+                target.save(update_fields=['amount'])
+                row.delete()
+        Ingredients.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+    # данные сливаются в отдельной транзакции: PostgreSQL не даёт менять
+    # таблицу, пока не проверены отложенные внешние ключи
+    atomic = False
+
+    dependencies = [
+        ('recipes', '0007_rename_count_recipesingredients_amount'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicates, migrations.RunPython.noop, atomic=True
+        ),
+        migrations.AddConstraint(
+            model_name='ingredients',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+    ]
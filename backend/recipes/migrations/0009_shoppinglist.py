@@ -0,0 +1,57 @@
+# Generated by Django 3.2.13 on 2026-10-18 12:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_shopping_lists(apps, schema_editor):
+    RecipesIngredients = apps.get_model('recipes', 'RecipesIngredients')
+    ShoppingList = apps.get_model('recipes', 'ShoppingList')
+    totals = (
+        RecipesIngredients.objects.
+        filter(recipes__shopping_cart__user__isnull=False).
+        values('recipes__shopping_cart__user', 'ingredients').
+        order_by().
+        annotate(total=models.Sum('amount'))
+    )
+    ShoppingList.objects.bulk_create(
+        [
+            ShoppingList(
+                user_id=row['recipes__shopping_cart__user'],
+                ingredient_id=row['ingredients'],
+                amount=row['total']
+            )
+            for row in totals.iterator()
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0008_ingredients_unique_ingredient'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingList',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField(verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_lists', to='recipes.ingredients', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Список покупок',
+                'verbose_name_plural': 'ShoppingLists',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglist',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_shoppinglist'),
+        ),
+        migrations.RunPython(fill_shopping_lists, migrations.RunPython.noop),
+    ]
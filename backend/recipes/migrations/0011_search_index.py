@@ -0,0 +1,85 @@
+# Generated by Django 3.2.13 on 2026-10-18 18:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 500
+
+
+def build_index(apps, schema_editor):
+    # то же, что search.rebuild, но на моделях миграции; позже индекс
+    # можно пересобрать командой rebuild_search_index
+    from collections import defaultdict
+
+    from api.services.search import document_terms
+
+    Recipes = apps.get_model('recipes', 'Recipes')
+    RecipesIngredients = apps.get_model('recipes', 'RecipesIngredients')
+    SearchDocument = apps.get_model('recipes', 'SearchDocument')
+    SearchTerm = apps.get_model('recipes', 'SearchTerm')
+    recipe_ids = list(
+        Recipes.objects.order_by('id').values_list('id', flat=True)
+    )
+    for start in range(0, len(recipe_ids), BATCH_SIZE):
+        batch = recipe_ids[start:start + BATCH_SIZE]
+        ingredients = defaultdict(list)
+        for recipe_id, name in RecipesIngredients.objects.filter(
+            recipes_id__in=batch
+        ).values_list('recipes_id', 'ingredients__name'):
+            ingredients[recipe_id].append(name)
+        documents = []
+        rows = []
+        for recipe_id, name, text in Recipes.objects.filter(
+            id__in=batch
+        ).values_list('id', 'name', 'text'):
+            frequencies = document_terms(name, text, ingredients[recipe_id])
+            documents.append(SearchDocument(
+                recipe_id=recipe_id, length=sum(frequencies.values())
+            ))
+            rows += [
+                SearchTerm(
+                    document_id=recipe_id, term=term, frequency=frequency
+                )
+                for term, frequency in frequencies.items()
+            ]
+        SearchDocument.objects.bulk_create(documents, batch_size=BATCH_SIZE)
+        SearchTerm.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipes_pub_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='recipes.recipes', verbose_name='Рецепт')),
+                ('length', models.PositiveIntegerField(verbose_name='Взвешенное число слов')),
+            ],
+            options={
+                'verbose_name': 'Документ поискового индекса',
+                'verbose_name_plural': 'SearchDocuments',
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Основа слова')),
+                ('frequency', models.PositiveIntegerField(verbose_name='Взвешенная частота')),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='recipes.searchdocument', verbose_name='Документ')),
+            ],
+            options={
+                'verbose_name': 'Слово поискового индекса',
+                'verbose_name_plural': 'SearchTerms',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'document'), name='unique_search_term'),
+        ),
+        migrations.RunPython(build_index, migrations.RunPython.noop),
+    ]
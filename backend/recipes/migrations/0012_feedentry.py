@@ -0,0 +1,80 @@
+# Generated by Django 3.2.13 on 2026-10-18 21:05
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+
+
+def fill_feed(apps, schema_editor):
+    # то же, что feed.rebuild: рецепты авторов, у которых больше
+    # FEED_PULL_RECIPES рецептов, читаются при показе ленты
+    Recipes = apps.get_model('recipes', 'Recipes')
+    FeedEntry = apps.get_model('recipes', 'FeedEntry')
+    Subscribtion = apps.get_model('users', 'Subscribtion')
+    pull_authors = Recipes.objects.values('author_id').order_by().annotate(
+        total=Count('id')
+    ).filter(
+        total__gt=getattr(settings, 'FEED_PULL_RECIPES', 500)
+    ).values('author_id')
+    rows = Subscribtion.objects.exclude(
+        author_id__in=pull_authors
+    ).filter(author__recipes__isnull=False).values_list(
+        'user_id', 'author_id', 'author__recipes__id',
+        'author__recipes__pub_date'
+    ).order_by()
+    batch = []
+    for user_id, author_id, recipe_id, pub_date in rows.iterator():
+        batch.append(FeedEntry(
+            user_id=user_id, author_id=author_id,
+            recipe_id=recipe_id, pub_date=pub_date
+        ))
+        if len(batch) == BATCH_SIZE:
+            FeedEntry.objects.bulk_create(batch)
+            batch = []
+    FeedEntry.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0011_search_index'),
+        ('users', '0002_remove_user_is_subscribed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='recipes.recipes', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'FeedEntries',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recipes',
+            index=models.Index(fields=['author', '-pub_date', '-id'], name='recipes_author_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', '-pub_date', '-recipe'], name='feed_user_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', 'author'], name='feed_user_author_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_feed_entry'),
+        ),
+        migrations.RunPython(fill_feed, migrations.RunPython.noop),
+    ]
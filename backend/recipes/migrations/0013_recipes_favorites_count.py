@@ -0,0 +1,40 @@
+# Generated by Django 3.2.13 on 2026-10-18 22:10
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_favorites(apps, schema_editor):
+    Recipes = apps.get_model('recipes', 'Recipes')
+    Favorites = apps.get_model('recipes', 'Favorites')
+    Recipes.objects.update(favorites_count=Coalesce(
+        Subquery(
+            Favorites.objects.filter(recipe=OuterRef('pk')).
+            order_by().
+            values('recipe').
+            annotate(total=Count('id')).
+            values('total')
+        ),
+        0
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_feedentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='В избранном'),
+        ),
+        migrations.AddIndex(
+            model_name='recipes',
+            index=models.Index(fields=['-favorites_count', '-id'], name='recipes_popular_idx'),
+        ),
+        migrations.RunPython(count_favorites, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.13 on 2026-10-18 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_trending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='image_variants',
+            field=models.BooleanField(default=False, verbose_name='Копии картинки готовы'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.13 on 2026-10-19 10:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_recipes_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='searchterm',
+            index=models.Index(fields=['term', '-frequency'], name='search_term_impact'),
+        ),
+    ]
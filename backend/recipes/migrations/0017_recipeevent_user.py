@@ -0,0 +1,30 @@
+# Generated by Django 3.2.13 on 2026-10-19 11:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0016_searchterm_impact'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipeevent',
+            name='user',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='recipe_events', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AddField(
+            model_name='recipeevent',
+            name='rolled',
+            field=models.BooleanField(default=False, verbose_name='Свёрнуто'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipeevent',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe', 'kind'), name='unique_recipe_event'),
+        ),
+    ]
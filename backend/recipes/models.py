@@ -1,6 +1,11 @@
 from django.db import models
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
 from django.core.validators import MinValueValidator
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from users.models import Subscribtion
 
 CHOICES_COLOR = (
     ('#E26C2D', '#E26C2D'),
@@ -35,6 +40,12 @@ class Ingredients(models.Model):
         verbose_name = "Ингредиент"
         verbose_name_plural = "Ingredients"
         ordering = ('id',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient'
+            )
+        ]
 
     def __str__(self):
         return self.name
@@ -65,6 +76,73 @@ class Tag(models.Model):
         return self.name
 
 
+class RecipesQuerySet(models.QuerySet):
+    """Выборки рецептов для API"""
+
+    def latest_per_author(self, author_ids, limit):
+        """Не больше limit последних рецептов каждого автора.
+
+        Номер рецепта внутри автора считается оконной функцией
+        ROW_NUMBER() одним запросом по всем авторам сразу.
+        """
+        ranked = (
+            Recipes.objects.filter(author_id__in=author_ids).
+            annotate(row_number=models.Window(
+                expression=RowNumber(),
+                partition_by=models.F('author_id'),
+                order_by=models.F('pub_date').desc(),
+            )).
+            order_by().
+            values('id', 'row_number')
+        )
+        sql, params = ranked.query.sql_with_params()
+        return self.filter(pk__in=RawSQL(
+            f'SELECT ranked.id FROM ({sql}) ranked '
+            f'WHERE ranked.row_number <= %s',
+            (*params, limit)
+        ))
+
+    def with_user_flags(self, user):
+        """Признаки избранного и корзины для текущего пользователя"""
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=models.Value(
+                    False, output_field=models.BooleanField()
+                ),
+                is_in_shopping_cart=models.Value(
+                    False, output_field=models.BooleanField()
+                ),
+            )
+        return self.annotate(
+            is_favorited=models.Exists(Favorites.objects.filter(
+                user=user, recipe=models.OuterRef('pk')
+            )),
+            is_in_shopping_cart=models.Exists(ShoppingCart.objects.filter(
+                user=user, recipe=models.OuterRef('pk')
+            )),
+        )
+
+    def for_read(self, user):
+        """Рецепты со всеми связанными данными для сериализатора чтения"""
+        authors = User.objects.all()
+        if user.is_authenticated:
+            authors = authors.annotate(is_subscribed=models.Exists(
+                Subscribtion.objects.filter(
+                    user=user, author=models.OuterRef('pk')
+                )
+            ))
+        return self.with_user_flags(user).prefetch_related(
+            'tags',
+            models.Prefetch('author', queryset=authors),
+            models.Prefetch(
+                'recipe',
+                queryset=RecipesIngredients.objects.select_related(
+                    'ingredients'
+                )
+            ),
+        )
+
+
 class Recipes(models.Model):
     author = models.ForeignKey(
         User,
@@ -85,6 +163,11 @@ class Recipes(models.Model):
         upload_to='recipes/',
         verbose_name='Картинка'
     )
+    # уменьшенные копии картинки уже сохранены, см. api.services.images
+    image_variants = models.BooleanField(
+        default=False,
+        verbose_name='Копии картинки готовы'
+    )
     text = models.TextField(
         verbose_name='Описание рецепта'
     )
@@ -112,11 +195,32 @@ class Recipes(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации'
     )
+    # поддерживается api.services.favorites, сверяется командой
+    # reconcile_favorites_count
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='В избранном'
+    )
+
+    objects = RecipesQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Рецепт"
         verbose_name_plural = 'Recipes'
         ordering = ['-pub_date', ]
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='recipes_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='recipes_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['-favorites_count', '-id'],
+                name='recipes_popular_idx'
+            ),
+        ]
 
     def _amount_ingredients(self):
         return self.ingredients.amount()
@@ -206,3 +310,253 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return self.user
+
+
+class ShoppingList(models.Model):
+    """Суммарное количество ингредиентов в корзине пользователя.
+
+    Поддерживается api.services.shopping_list при изменении корзины
+    и рецептов в ней, пересобирается командой rebuild_shopping_lists.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredients,
+        on_delete=models.CASCADE,
+        related_name='shopping_lists',
+        verbose_name='Ингредиент'
+    )
+    amount = models.IntegerField(
+        verbose_name='Количество'
+    )
+
+    class Meta:
+        verbose_name = 'Список покупок'
+        verbose_name_plural = 'ShoppingLists'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'], name='unique_shoppinglist'
+            )
+        ]
+
+
+class SearchDocument(models.Model):
+    """Рецепт в поисковом индексе.
+
+    Строки индекса поддерживает api.services.search при сохранении
+    рецептов, пересобирает команда rebuild_search_index.
+    """
+    recipe = models.OneToOneField(
+        Recipes,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_document',
+        verbose_name='Рецепт'
+    )
+    length = models.PositiveIntegerField(
+        verbose_name='Взвешенное число слов'
+    )
+
+    class Meta:
+        verbose_name = 'Документ поискового индекса'
+        verbose_name_plural = 'SearchDocuments'
+
+
+class SearchTerm(models.Model):
+    """Обратный индекс: основа слова и её вес в рецепте"""
+    term = models.CharField(
+        max_length=64,
+        verbose_name='Основа слова'
+    )
+    document = models.ForeignKey(
+        SearchDocument,
+        on_delete=models.CASCADE,
+        related_name='terms',
+        verbose_name='Документ'
+    )
+    frequency = models.PositiveIntegerField(
+        verbose_name='Взвешенная частота'
+    )
+
+    class Meta:
+        verbose_name = 'Слово поискового индекса'
+        verbose_name_plural = 'SearchTerms'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'document'], name='unique_search_term'
+            )
+        ]
+        indexes = [
+            # первые строки по основе для поиска
+            models.Index(
+                fields=['term', '-frequency'], name='search_term_impact'
+            )
+        ]
+
+
+class FeedEntry(models.Model):
+    """Рецепт в ленте подписок пользователя.
+
+    Строки раскладывает api.services.feed при публикации рецепта,
+    подписке и отписке, пересобирает команда rebuild_feed. Рецепты
+    авторов, у которых рецептов больше FEED_PULL_RECIPES, в ленту
+    не раскладываются и читаются из Recipes при показе.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipes,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'FeedEntries'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'], name='unique_feed_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-recipe'],
+                name='feed_user_pub_date_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'], name='feed_user_author_idx'
+            ),
+        ]
+
+
+class RecipeEvent(models.Model):
+    """Добавление рецепта в избранное или корзину с отметкой времени.
+
+    Строки только добавляются; команда refresh_trending сворачивает их
+    в RecipeActivity и удаляет через неделю. До удаления строка не даёт
+    тому же пользователю ещё раз добавить рецепту популярности.
+    """
+    FAVORITE = 1
+    CART = 2
+    KINDS = (
+        (FAVORITE, 'Избранное'),
+        (CART, 'Корзина'),
+    )
+
+    recipe = models.ForeignKey(
+        Recipes,
+        on_delete=models.CASCADE,
+        related_name='events',
+        verbose_name='Рецепт'
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name='recipe_events',
+        verbose_name='Пользователь'
+    )
+    kind = models.PositiveSmallIntegerField(
+        choices=KINDS,
+        verbose_name='Событие'
+    )
+    created = models.DateTimeField(
+        default=timezone.now,
+        db_index=True,
+        verbose_name='Время'
+    )
+    rolled = models.BooleanField(
+        default=False,
+        verbose_name='Свёрнуто'
+    )
+
+    class Meta:
+        verbose_name = 'Событие рецепта'
+        verbose_name_plural = 'RecipeEvents'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe', 'kind'], name='unique_recipe_event'
+            )
+        ]
+
+
+class RecipeActivity(models.Model):
+    """Число добавлений рецепта в избранное и корзину за час или день"""
+    HOUR = 'hour'
+    DAY = 'day'
+    PERIODS = (
+        (HOUR, 'Час'),
+        (DAY, 'День'),
+    )
+
+    recipe = models.ForeignKey(
+        Recipes,
+        on_delete=models.CASCADE,
+        related_name='activity',
+        verbose_name='Рецепт'
+    )
+    period = models.CharField(
+        max_length=4,
+        choices=PERIODS,
+        verbose_name='Период'
+    )
+    start = models.DateTimeField(
+        verbose_name='Начало периода'
+    )
+    favorites = models.PositiveIntegerField(
+        default=0,
+        verbose_name='В избранное'
+    )
+    carts = models.PositiveIntegerField(
+        default=0,
+        verbose_name='В корзину'
+    )
+
+    class Meta:
+        verbose_name = 'Активность рецепта'
+        verbose_name_plural = 'RecipeActivities'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['period', 'start', 'recipe'],
+                name='unique_recipe_activity'
+            )
+        ]
+
+
+class TrendingRecipe(models.Model):
+    """Рецепт в списке популярных за неделю, пересчитывается командой"""
+    recipe = models.OneToOneField(
+        Recipes,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending',
+        verbose_name='Рецепт'
+    )
+    score = models.FloatField(
+        verbose_name='Оценка'
+    )
+
+    class Meta:
+        verbose_name = 'Популярный рецепт'
+        verbose_name_plural = 'TrendingRecipes'
+        indexes = [
+            models.Index(fields=['-score'], name='trending_score_idx')
+        ]
@@ -0,0 +1,43 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+# меньшие таблицы дешевле посчитать точно
+ESTIMATE_THRESHOLD = 10000
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор админки без COUNT(*) по всей таблице.
+
+    Для списка без фильтров и поиска число строк берётся из статистики
+    PostgreSQL (pg_class.reltuples), которую обновляет autovacuum.
+    На последних страницах оценка может разойтись с точным числом,
+    зато открытие списка не читает всю таблицу. В остальных случаях
+    и на других БД считается как обычно.
+    """
+
+    @cached_property
+    def count(self):
+        estimate = self.estimate()
+        if estimate is not None and estimate > ESTIMATE_THRESHOLD:
+            return estimate
+        return super().count
+
+    def estimate(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None or query.where or query.distinct:
+            return None
+        connection = connections[self.object_list.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = to_regclass(%s)',
+                [connection.ops.quote_name(query.model._meta.db_table)]
+            )
+            row = cursor.fetchone()
+        # -1 - таблица ещё ни разу не анализировалась
+        if row is None or row[0] < 0:
+            return None
+        return row[0]
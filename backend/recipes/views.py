@@ -1,5 +1,5 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db.models import Case, IntegerField, Value, When
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework.backends import DjangoFilterBackend
 
 from rest_framework import viewsets
@@ -7,22 +7,46 @@ from rest_framework.permissions import (
     IsAuthenticated, AllowAny, SAFE_METHODS
 )
 from rest_framework.decorators import action
+from rest_framework.response import Response
 
 from .models import (
-    Ingredients, RecipesIngredients, ShoppingCart, Tag,
+    Ingredients, ShoppingCart, ShoppingList, Tag,
     Recipes, Favorites
 )
 from api.serializers import (
-    IngredientsSerializer, TagSerializer, RecipesWriteSerializer,
-    RecipesReadSerializer
+    CookableQuerySerializer, CookableRecipeSerializer, IngredientsSerializer,
+    TagSerializer, RecipesWriteSerializer, RecipesReadSerializer
+)
+from api.async_views import AsyncReadMixin
+from api.caching import (
+    AnonymousCacheMixin, IngredientsConditionalGetMixin,
+    RecipesConditionalGetMixin, TagsConditionalGetMixin
+)
+from api.services.add_to import bulk_post_or_del_method, post_or_del_method
+from api.services import feed, search
+from api.services.cookable_index import cookable_index
+from api.services.ingredient_index import ingredient_index
+from api.paginations import (
+    FeedPagination, LimitPageNumberPagination, RecipesPagination
 )
-from api.services.add_to import post_or_del_method
-from api.paginations import LimitPageNumberPagination
 from api.filters import Fav_Cart_Filter, FilterIngredients
 from api.permissions import AuthorOrReadOnly
+from api.renderers import SHOPPING_LIST_RENDERERS
+
+
+def in_order(ids):
+    """Сортировка в порядке списка ids"""
+    return Case(
+        *(When(id=pk, then=Value(position))
+          for position, pk in enumerate(ids)),
+        output_field=IntegerField()
+    )
 
 
-class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientsViewSet(
+    AsyncReadMixin, IngredientsConditionalGetMixin,
+    viewsets.ReadOnlyModelViewSet
+):
     queryset = Ingredients.objects.all()
     serializer_class = IngredientsSerializer
     filter_backends = (DjangoFilterBackend,)
@@ -30,23 +54,56 @@ class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ('name',)
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        # автодополнение обслуживается индексом в памяти, без запросов к БД;
+        # с другими параметрами запрос идёт через FilterIngredients
+        name = request.query_params.get('name')
+        if name and set(request.query_params) == {'name'}:
+            return self.conditional_response(
+                request, lambda: Response(ingredient_index.search(name))
+            )
+        return super().list(request, *args, **kwargs)
+
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(
+    AsyncReadMixin, TagsConditionalGetMixin, viewsets.ModelViewSet
+):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AllowAny,)
     pagination_class = None
 
 
-class RecipesViewSet(viewsets.ModelViewSet):
+class RecipesViewSet(
+    AsyncReadMixin, RecipesConditionalGetMixin, AnonymousCacheMixin,
+    viewsets.ModelViewSet
+):
     queryset = Recipes.objects.all()
-    pagination_class = LimitPageNumberPagination
+    pagination_class = RecipesPagination
     permission_classes = (AuthorOrReadOnly,)
     filterset_class = Fav_Cart_Filter
     filter_backends = (DjangoFilterBackend,)
     search_fields = ('is_favorited', 'author', 'shopping_cart', 'tags')
 
+    def get_queryset(self):
+        if self.request.method in SAFE_METHODS:
+            return Recipes.objects.for_read(self.request.user)
+        return Recipes.objects.all()
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        query = self.request.query_params.get('search')
+        if not query or self.action != 'list':
+            return queryset
+        # ?search= - рецепты по убыванию релевантности, с учётом фильтров
+        ids = search.search(query, queryset)
+        if not ids:
+            return queryset.none()
+        return queryset.filter(id__in=ids).order_by(in_order(ids))
+
     def get_serializer_class(self):
+        if self.action == 'cookable':
+            return CookableRecipeSerializer
         if self.request.method in SAFE_METHODS:
             return RecipesReadSerializer
         return RecipesWriteSerializer
@@ -78,30 +135,106 @@ class RecipesViewSet(viewsets.ModelViewSet):
         return post_or_del_method(method, user, pk, ShoppingCart)
 
     @action(
+        methods=('POST', 'DELETE'),
         detail=False,
-        permission_classes=[IsAuthenticated]
+        permission_classes=(IsAuthenticated,),
+        url_path='favorite'
     )
-    # скачать рецепт с описанием и ингредиентами
-    def download_shopping_cart(self, request):
-        user = request.user
-        ingredient_list_user = (
-            RecipesIngredients.objects.
-            prefetch_related('ingredients', 'recipes').
-            filter(recipes__shopping_cart__user=user).
-            values('ingredients__id').
-            order_by('ingredients__id')
+    # пакетное добавление/удаление: {"recipes": [id, ...]}
+    def favorites_bulk(self, request):
+        return bulk_post_or_del_method(request, Favorites)
+
+    @action(
+        methods=('POST', 'DELETE'),
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        url_path='shopping_cart'
+    )
+    def shopping_cart_bulk(self, request):
+        return bulk_post_or_del_method(request, ShoppingCart)
+
+    @action(
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        pagination_class=FeedPagination
+    )
+    # рецепты авторов из подписок, от новых к старым: ?cursor=&limit=
+    def feed(self, request):
+        page = self.paginate_queryset(feed.sources(request.user))
+        recipes = self.get_queryset().in_bulk(
+            [row['recipe_id'] for row in page]
         )
+        serializer = self.get_serializer(
+            # рецепт могли удалить между двумя запросами
+            [recipes[row['recipe_id']] for row in page
+             if row['recipe_id'] in recipes],
+            many=True
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, pagination_class=LimitPageNumberPagination)
+    # популярные за неделю, пересчитываются командой refresh_trending;
+    # фильтры работают как в списке рецептов
+    def trending(self, request):
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            trending__isnull=False
+        ).order_by('-trending__score', '-id')
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, pagination_class=LimitPageNumberPagination)
+    # что приготовить из продуктов: ?ingredients=1&ingredients=2&missing=1,
+    # фильтры по тегам и автору работают как в списке рецептов
+    def cookable(self, request):
+        params = CookableQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        queryset = self.filter_queryset(self.get_queryset())
+        allowed = None
+        if queryset.query.has_filters():
+            # фильтры проверяются в БД только для кандидатов из индекса
+            def allowed(ids):
+                return set(
+                    queryset.filter(id__in=ids).values_list('id', flat=True)
+                )
+        found = cookable_index.match(
+            params.validated_data['ingredients'],
+            params.validated_data['missing'],
+            allowed
+        )
+        if found:
+            ids = [pk for pk, _ in found]
+            queryset = queryset.filter(id__in=ids).annotate(missing=Case(
+                *(When(id=pk, then=Value(lack)) for pk, lack in found),
+                output_field=IntegerField()
+            )).order_by(in_order(ids))
+        else:
+            queryset = queryset.none()
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        renderer_classes=SHOPPING_LIST_RENDERERS
+    )
+    # скачать список покупок: ?format=txt|csv|json
+    def download_shopping_cart(self, request):
         shopping_list = (
-            ingredient_list_user.annotate(amount=Sum('amount')).
+            ShoppingList.objects.
+            filter(user=request.user).
+            order_by('ingredient_id').
             values_list(
-                'ingredients__name', 'ingredients__measurement_unit', 'amount',
+                'ingredient__name', 'ingredient__measurement_unit', 'amount',
             )
         )
-        shopping_cart = '\n'.join([
-            f'{ingredient[0]} - {ingredient[2]} {ingredient[1]}'
-            for ingredient in shopping_list
-        ])
-        filename = 'shopping_cart.txt'
-        response = HttpResponse(shopping_cart, content_type='text/plain')
+        # строки читаются курсором на стороне БД и сразу уходят клиенту
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(shopping_list.iterator(chunk_size=500)),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}'
+        )
+        filename = f'shopping_cart.{renderer.extension}'
         response['Content-Disposition'] = f'attachment; filename={filename}'
         return response
@@ -1,4 +1,6 @@
 from django.contrib import admin
+
+from recipes.paginators import EstimatedCountPaginator
 from .models import User
 
 
@@ -12,5 +14,8 @@ class UserAdmin(admin.ModelAdmin):
         'first_name',
         'last_name',
     )
-    list_filter = ('username', 'email')
+    # фильтры по никнейму и почте выводили всех пользователей
+    list_filter = ('is_staff', 'is_active')
     search_fields = ('username', 'email')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -1 +1,89 @@
-#  Create your tests here
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from recipes.models import Recipes
+from users.models import Subscribtion, User
+
+
+class RecipesLimitTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create(
+            username='reader', email='reader@ya.ru'
+        )
+        cls.authors = [
+            User.objects.create(
+                username=f'author{number}', email=f'author{number}@ya.ru'
+            )
+            for number in range(2)
+        ]
+        now = timezone.now()
+        cls.latest = {}
+        for author in cls.authors:
+            recipes = [
+                Recipes.objects.create(
+                    author=author, name=f'{author.username} {number}',
+                    text='Описание', image='recipes/test.png', cooking_time=5
+                )
+                for number in range(3)
+            ]
+            # id и дата публикации идут в разном порядке
+            for days, recipe in zip((1, 3, 2), recipes):
+                Recipes.objects.filter(pk=recipe.pk).update(
+                    pub_date=now - timedelta(days=days)
+                )
+            cls.latest[author.username] = [
+                recipes[0].name, recipes[2].name
+            ]
+        Subscribtion.objects.create(user=cls.reader, author=cls.authors[0])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def recipes(self, response):
+        return {
+            author['username']: [
+                recipe['name'] for recipe in author['recipes']
+            ]
+            for author in response.data['results']
+        }
+
+    def test_newest_recipes_per_author(self):
+        Subscribtion.objects.create(user=self.reader, author=self.authors[1])
+        response = self.client.get('/api/users/subscriptions/?recipes_limit=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.recipes(response), self.latest)
+        self.assertEqual(
+            [author['recipes_count'] for author in response.data['results']],
+            [3, 3]
+        )
+
+    def test_invalid_limit_is_ignored(self):
+        for value in ('abc', '0', '-1', ''):
+            response = self.client.get(
+                f'/api/users/subscriptions/?recipes_limit={value}'
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                len(self.recipes(response)['author0']), 3, value
+            )
+
+    def test_subscribe_respects_limit(self):
+        url = f'/api/users/{self.authors[1].id}/subscribe/'
+        response = self.client.post(f'{url}?recipes_limit=2')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [recipe['name'] for recipe in response.data['recipes']],
+            self.latest['author1']
+        )
+        self.client.delete(url)
+        response = self.client.post(f'{url}?recipes_limit=abc')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['recipes']), 3)
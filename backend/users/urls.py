@@ -1,6 +1,12 @@
 from django.urls import include, path
+from rest_framework.routers import DefaultRouter
 
-from users.views import SubcribeApiView, SubcribeListAPIView
+from users.views import (
+    CustomUserViewSet, SubcribeApiView, SubcribeListAPIView
+)
+
+router = DefaultRouter()
+router.register('users', CustomUserViewSet)
 
 urlpatterns = [
     path('users/<int:id>/subscribe/', SubcribeApiView.as_view(),
@@ -8,5 +14,5 @@ urlpatterns = [
     path('users/subscriptions/', SubcribeListAPIView.as_view(),
          name='subscription'),
     path('auth/', include('djoser.urls.authtoken')),
-    path('', include('djoser.urls')),
+    path('', include(router.urls)),
 ]
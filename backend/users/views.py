@@ -1,14 +1,34 @@
+from django.db.models import (
+    BooleanField, Count, Exists, OuterRef, Prefetch, Value,
+    prefetch_related_objects
+)
+from djoser.views import UserViewSet
 from rest_framework import status
 from rest_framework.generics import ListAPIView, get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from api.paginations import LimitPageNumberPagination
+from api.async_views import AsyncReadMixin
+from api.paginations import SubscriptionsPagination, get_recipes_limit
+from recipes.models import Recipes
 from users.models import Subscribtion, User
 from api.serializers import SubcribeListSerializer, SubcribeSerializer
 
 
+class CustomUserViewSet(UserViewSet):
+    """Пользователи с признаком подписки, посчитанным в том же запросе"""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if user.is_authenticated:
+            queryset = queryset.annotate(is_subscribed=Exists(
+                Subscribtion.objects.filter(user=user, author=OuterRef('pk'))
+            ))
+        return queryset
+
+
 class SubcribeApiView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -32,14 +52,26 @@ class SubcribeApiView(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class SubcribeListAPIView(ListAPIView):
-    pagination_class = LimitPageNumberPagination
+class SubcribeListAPIView(AsyncReadMixin, ListAPIView):
+    pagination_class = SubscriptionsPagination
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         user = request.user
-        queryset = User.objects.filter(author__user=user)
+        queryset = User.objects.filter(author__user=user).annotate(
+            recipes_count=Count('recipes', distinct=True),
+            is_subscribed=Value(True, output_field=BooleanField()),
+        ).order_by('username')
         page = self.paginate_queryset(queryset)
+        recipes = Recipes.objects.all()
+        recipes_limit = get_recipes_limit(request)
+        if recipes_limit is not None:
+            recipes = recipes.latest_per_author(
+                [author.id for author in page], recipes_limit
+            )
+        prefetch_related_objects(
+            page, Prefetch('recipes', queryset=recipes)
+        )
         serializer = SubcribeListSerializer(
             page, many=True,
             context={'request': request}